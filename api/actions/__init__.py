@@ -6,6 +6,7 @@ from .action_root import Root
 from .action_nlp import NLP
 from .action_wordmap import WordmapAction
 from .action_summarization import SummarizationAction
+from .action_terms import TermsAction
 
 __all__ = [
     "Action",
@@ -13,4 +14,5 @@ __all__ = [
     "NLP",
     "WordmapAction",
     "SummarizationAction",
+    "TermsAction",
 ]
@@ -1,10 +1,18 @@
 import json
+import os
+from functools import partial
 from flask import request, abort
 from .action_base import Action
 from logger import logger
 from nlp import Nlpy
+from nlp.normalize import normalize
 from nlp.json.json_model import Document, Entity, Relation, Span
 
+# texts longer than this (chars) are processed in chunks (see nlp.longdoc)
+LONG_DOC_CHARS = int(os.environ.get('NLPY_LONG_DOC_CHARS', 100000))
+# processes used for the chunks of a long text
+LONG_DOC_PROCS = int(os.environ.get('NLPY_LONG_DOC_PROCS', 1))
+
 
 class NLP(Action):
     def __init__(self):
@@ -22,31 +30,62 @@ class NLP(Action):
         model = request.json['model'] if (
             'model' in request.json) else default_model
 
-        # load model
-        nlp = Nlpy.load(model)
-
         # get the text
         text = request.json['text']
 
         process_all = 0 == len(request.args) or 'all' in request.args
         process_entities = process_all or 'entities' in request.args
         process_relations = process_all or 'relations' in request.args
+        # merged tokens: entities (and noun chunks) as single tokens
+        process_tokens = 'tokens' in request.args
+        noun_chunks = 'noun_chunks' in request.args
+
+        # run only the pipeline components needed for the request
+        features = ['relations'] if process_relations else ['entities']
+        if (process_tokens and noun_chunks):
+            features.append('noun_chunks')
+        merge = None
+        if process_tokens:
+            # lazy import: spacy loads on first use
+            from nlp.entities.merge import merge_entities
+            merge = partial(merge_entities, noun_chunks=noun_chunks)
 
         # process the document
         doc_json = Document()
         doc_json.entities = []
         try:
-            doc = nlp(text, model)
+            normalized, offsets = normalize(text)
+            if (len(normalized) > LONG_DOC_CHARS):
+                # long document: process in chunks
+                doc = Nlpy.process_long(
+                    normalized, model, max_chars=LONG_DOC_CHARS, n_process=LONG_DOC_PROCS,
+                    features=features, merge=merge)
+                ents = doc.entities
+                relations = [to_tuple(r) for r in doc.relations]
+                tokens = doc.tokens if merge else []
+            else:
+                # load model (kept cached while processing)
+                with Nlpy.use(model, features=features) as nlp:
+                    doc = nlp(normalized)
+                ents = [Entity(e.text, e.start_char, e.end_char, e.label_)
+                        for e in doc.ents]
+                relations = [to_tuple(r) for r in doc._.relations]
+                tokens = []
+                if merge:
+                    # one retokenization pass (after reading entities/relations)
+                    tokens = [Span(t.text, t.idx, t.idx + len(t)) for t in merge(doc)]
 
-            # create result
+            # create result (offsets in the original text)
             if process_entities:
-                for ent in doc.ents:
-                    e_json = Entity(ent.text, ent.start_char,
-                                    ent.end_char, ent.label_)
+                for ent in ents:
+                    start_char, end_char = offsets.span(
+                        ent.start_char, ent.end_char)
+                    e_json = Entity(text[start_char:end_char], start_char,
+                                    end_char, ent.label)
                     doc_json.entities.append(e_json)
 
             if process_relations:
-                for r in doc._.relations:
+                for r in relations:
                     # lilo:TODO - should we give entities in json_doc an id and use these ids in the relations?
                     # s = Entity(r.s.text, r.s.start_char, r.s.end_char,
                     #            r.s.label_) if r.s else None
@@ -56,7 +95,14 @@ class NLP(Action):
                     # w = Entity(r.w.text, r.w.start_char, r.w.end_char,
                     #            r.w.label_) if r.w else None
                     # r_json = Relation(s, p, o, w)
-                    doc_json.relations.append(to_tuple(r))
+                    doc_json.relations.append(r)
+
+            if process_tokens:
+                doc_json.tokens = []
+                for t in tokens:
+                    start_char, end_char = offsets.span(t.start_char, t.end_char)
+                    doc_json.tokens.append(
+                        Span(text[start_char:end_char], start_char, end_char))
 
         except Exception as ex:
             logger.exception(ex)
@@ -1,5 +1,6 @@
 from datetime import datetime
 from .action_base import Action
+from nlp.warmup import ready
 
 
 class Root(Action):
@@ -12,6 +13,8 @@ class Root(Action):
         self.methods = ['GET']
 
     def __call__(self, *args):
+        if (not ready.is_set()):
+            return "nlpy service warming up.", 503
         now = datetime.now()
         formatted_now = now.strftime("%A, %d %B, %Y at %X")
         return "nlpy service ready.<br>" + formatted_now, 200
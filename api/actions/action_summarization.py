@@ -2,7 +2,6 @@ import json
 from flask import request, abort
 from .action_base import Action
 from logger import logger
-from nlp.summarization.jensim_summarizer import Summarization
 
 
 class SummarizationAction(Action):
@@ -12,6 +11,9 @@ class SummarizationAction(Action):
         self.methods = ['POST']
 
     def __call__(self, *args):
+        # lazy import: gensim loads on first use
+        from nlp.summarization.jensim_summarizer import Summarization
+
         # text is a required field
         if not request.json or not 'text' in request.json:
             abort(400)  # bad request
@@ -0,0 +1,81 @@
+import hmac
+import json
+import os
+from flask import request, abort
+from .action_base import Action
+from logger import logger
+from nlp import Nlpy
+
+OPS = ('add', 'remove', 'replace')
+
+# the endpoint is enabled only with a token (sent as the X-Nlpy-Token header)
+TOKEN_ENV = 'NLPY_TERMS_API_TOKEN'
+TOKEN_HEADER = 'X-Nlpy-Token'
+# set by the prefork server: updates would reach a single worker only
+PREFORK_ENV = 'NLPY_PREFORK_WORKERS'
+MAX_LABEL = 64  # max label length
+
+
+class TermsAction(Action):
+    '''
+    update the term list of a loaded model (no model reload): \n
+    {"model": "en", "label": "ANIMAL", "op": "add|remove|replace", "terms": [...]} \n
+    replace with an empty terms list removes the label.\n
+    enabled with NLPY_TERMS_API_TOKEN (not with the prefork server)
+    '''
+    def __init__(self):
+        self.name = __class__.__name__
+        self.endpoint = '/nlp/terms'
+        self.methods = ['POST']
+
+    def __call__(self, *args):
+        token = os.environ.get(TOKEN_ENV)
+        if (not token):
+            abort(404)  # disabled
+        header = request.headers.get(TOKEN_HEADER, '')
+        # (compared as bytes: compare_digest rejects non-ascii str)
+        if (not hmac.compare_digest(header.encode('utf-8'), token.encode('utf-8'))):
+            abort(403)  # forbidden
+        if (os.environ.get(PREFORK_ENV)):
+            # each worker has its own copy of the models: an update would reach one worker
+            return json.dumps({"error": "term updates are not supported with the prefork server"}), 409
+
+        # label and terms are required fields
+        if (not request.json):
+            abort(400)  # bad request
+        label = request.json.get('label')
+        terms = request.json.get('terms')
+        op = request.json.get('op', 'add')
+        if (not isinstance(label, str) or not label.strip() or len(label) > MAX_LABEL
+                or not op in OPS or not isinstance(terms, list)
+                or not all(isinstance(t, str) and t.strip() for t in terms)
+                or (not terms and op != 'replace')):
+            abort(400)  # bad request
+        label = label.strip()
+
+        # get model from request
+        default_model = 'en'  # default model
+        model = request.json['model'] if (
+            'model' in request.json) else default_model
+
+        try:
+            with Nlpy.use(model) as nlp:
+                matcher = nlp.get_pipe('nlpy_entities').term_matcher
+                if (None == matcher):
+                    return json.dumps({"error": "model '%s' has no term list" % model}), 400
+                try:
+                    if (op == 'add'):
+                        count = matcher.add_terms(label, terms)
+                    elif (op == 'remove'):
+                        count = matcher.remove_terms(label, terms)
+                    else:
+                        count = matcher.replace_terms(label, terms)
+                except ValueError as ex:
+                    # a term that can't be tokenized (no change)
+                    return json.dumps({"error": ex.args}), 400
+                stats = dict(matcher.stats)
+        except Exception as ex:
+            logger.exception(ex)
+            return json.dumps({"error": ex.args}), 500
+
+        return json.dumps({"label": label, "terms": count, "stats": stats}, indent=4), 200
@@ -3,8 +3,6 @@ from flask import request, abort
 from .action_base import Action
 from logger import logger
 from nlp import Nlpy
-from nlp.wordmap.wordmap import Wordmap
-from nlp.json.json_model import Document, Entity, Relation, Span
 
 
 class WordmapAction(Action):
@@ -14,6 +12,9 @@ class WordmapAction(Action):
         self.methods = ['POST']
 
     def __call__(self, *args):
+        # lazy import: gensim/spacy load on first use
+        from nlp.wordmap.wordmap import Wordmap
+
         # text is a required field
         if not request.json or not 'text' in request.json:
             abort(400)  # bad request
@@ -26,15 +27,14 @@ class WordmapAction(Action):
         # get the method from request
         method = request.json['method'] if ('method' in request.json) else None
 
-        # load model
-        nlp = Nlpy.load(model)
-
         # get the text
         text = request.json['text']
 
         # create word map
         try:
-            wmap = Wordmap(text, nlp, method=method)
+            # load model (kept cached while processing)
+            with Nlpy.use(model, features=['wordmap']) as nlp:
+                wmap = Wordmap(text, nlp, method=method)
         except Exception as ex:
             logger.exception(ex)
             return json.dumps({"error": ex.args}), 500
@@ -0,0 +1,134 @@
+#!env/bin/python
+'''
+prefork server: load models once in the parent process, then fork workers
+that share the loaded models (copy-on-write).
+
+Usage:
+    python api/prefork.py --workers 4 --models en,es
+'''
+
+import sys
+sys.path.append('.')
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+from logger import logger
+from nlp.warmup import preload, ready
+from werkzeug.serving import make_server
+from server import app
+
+# a worker exiting sooner than this (sec) is considered a crash loop
+_MIN_WORKER_LIFETIME = 1.0
+
+
+class PreforkServer(object):
+    '''
+    load models in the parent, fork N workers and restart them when they exit
+    '''
+
+    def __init__(self, host='127.0.0.1', port=5000, workers=2, models=()):
+        self.host = host
+        self.port = port
+        self.num_workers = workers
+        self.models = models
+        self.workers = {}  # pid -> start time
+        self.running = False
+        self.sock = None
+
+    def run(self):
+        # (inherited by the workers, see action_terms)
+        os.environ['NLPY_PREFORK_WORKERS'] = str(self.num_workers)
+
+        # load (and warm up) models once, in the parent
+        if self.models:
+            preload(self.models)
+        ready.set()
+
+        # move everything loaded so far out of gc tracking,
+        # so gc passes in the workers don't dirty (copy) the shared pages
+        gc.collect()
+        gc.freeze()
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(128)
+        self.sock.set_inheritable(True)
+        logger.info('Listening on http://%s:%d (%d workers)' %
+                    (self.host, self.port, self.num_workers))
+
+        self.running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        for _ in range(self.num_workers):
+            self._spawn()
+        self._supervise()
+
+    def _spawn(self):
+        pid = os.fork()
+        if (0 == pid):
+            # worker
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                server = make_server(self.host, self.port,
+                                     app, fd=self.sock.fileno())
+                server.serve_forever()
+            finally:
+                os._exit(0)
+
+        self.workers[pid] = time.time()
+        logger.info('Started worker %d' % pid)
+
+    def _supervise(self):
+        ''' restart workers that exit (until stopped) '''
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            started = self.workers.pop(pid, None)
+            if (None == started):
+                continue
+            if (not self.running):
+                continue
+
+            logger.warning('Worker %d exited (status %d), restarting' %
+                           (pid, status))
+            if (time.time() - started < _MIN_WORKER_LIFETIME):
+                time.sleep(_MIN_WORKER_LIFETIME)  # avoid a tight crash loop
+            self._spawn()
+
+    def _stop(self, signum, frame):
+        self.running = False
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.workers.pop(pid, None)
+
+
+if __name__ == '__main__':
+    _argparser = argparse.ArgumentParser(
+        description='nlpy prefork server (models shared copy-on-write).')
+    _argparser.add_argument('--host', type=str,
+                            default='127.0.0.1', help='host to listen on')
+    _argparser.add_argument('-p', '--port', type=int,
+                            default=5000, help='port to listen on')
+    _argparser.add_argument('-w', '--workers', type=int,
+                            default=os.cpu_count(), help='number of worker processes')
+    _argparser.add_argument('-m', '--models', type=str,
+                            default=os.environ.get('NLPY_PRELOAD', 'en'),
+                            help='comma separated models to load before forking')
+    args = _argparser.parse_args()
+
+    models = [m.strip() for m in args.models.split(',') if m.strip()]
+    PreforkServer(args.host, args.port, args.workers, models).run()
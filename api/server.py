@@ -5,6 +5,7 @@ sys.path.append('.')
 
 from actions.action_base import Action
 from flask import Flask
+from nlp.warmup import preload_from_env
 
 
 def add_action(action):
@@ -20,6 +21,10 @@ app = Flask(__name__)
 for cls in Action.__subclasses__():
     add_action(cls())
 
+# preload/warmup models (NLPY_PRELOAD) before accepting traffic, on app creation:
+# the same for python api/server.py, flask run and WSGI servers
+preload_from_env()
+
 
 if __name__ == '__main__':
     app.run()
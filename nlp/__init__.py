@@ -1,5 +1,7 @@
 from .nlpy import Nlpy
+from .variants import PipelineVariant
 
 __all__ = [
     "Nlpy",
+    "PipelineVariant",
 ]
@@ -0,0 +1,95 @@
+'''
+entity candidates collected from all entity sources (NER, term lists, rules, ...),
+resolved into non-overlapping entities and committed to doc.ents once per doc.
+
+overlaps are resolved by priority (higher wins), then by span length (longer wins).
+whitespace only entities (NER tags pure whitespace as entities, see
+https://github.com/explosion/spaCy/issues/1717) are dropped.
+'''
+
+from spacy.attrs import IS_SPACE
+from spacy.tokens import Span
+from .span_index import SpanIndex
+
+# candidate priorities
+PRIORITY_NER = 0
+PRIORITY_TERM_LIST = 10
+PRIORITY_SPLIT = 20
+PRIORITY_RULES = 30
+
+
+class EntityCandidates(object):
+    '''
+    entity candidates of a single doc
+    '''
+
+    def __init__(self, doc):
+        self.doc = doc
+        self._candidates = []  # (priority, start, end, label)
+        self._removed = set()  # (start, end) of doc.ents to drop
+        self._ents = None
+        self._space = None  # IS_SPACE per token
+
+    @property
+    def ents(self):
+        ''' index of the doc entities (before this pipeline), for conflict checks '''
+        if (None == self._ents):
+            self._ents = SpanIndex.from_doc(self.doc)
+        return self._ents
+
+    def add(self, start, end, label, priority=PRIORITY_TERM_LIST):
+        ''' add a candidate entity (token offsets) '''
+        if (end <= start):
+            return
+        self._candidates.append((priority, start, end, label))
+
+    def add_span(self, span, label=None, priority=PRIORITY_TERM_LIST):
+        self.add(span.start, span.end, label or span.label, priority)
+
+    def append(self, entity):
+        ''' add a (start, end, label) candidate '''
+        start, end, label = entity
+        self.add(start, end, label)
+
+    def remove(self, span):
+        ''' drop an existing entity (e.g: replaced by its parts) '''
+        self.remove_range(span.start, span.end)
+
+    def remove_range(self, start, end):
+        ''' drop the existing entity doc[start:end] '''
+        self._removed.add((start, end))
+
+    def __iter__(self):
+        return iter((start, end, label) for _, start, end, label in self._candidates)
+
+    def __len__(self):
+        return len(self._candidates)
+
+    def is_space(self, start, end):
+        ''' is doc[start:end] whitespace only '''
+        if (self._space is None):
+            self._space = self.doc.to_array(IS_SPACE)
+        return bool(self._space[start:end].all())
+
+    def resolve(self):
+        ''' non-overlapping, non-whitespace entity spans (doc order) '''
+        candidates = [(PRIORITY_NER, e.start, e.end, e.label) for e in self.doc.ents
+                      if not (e.start, e.end) in self._removed]
+        candidates += self._candidates
+        candidates = [c for c in candidates if (not self.is_space(c[1], c[2]))]
+
+        # priority, then longest span, then leftmost
+        candidates.sort(key=lambda c: (-c[0], c[1] - c[2], c[1]))
+
+        resolved = SpanIndex()
+        for _, start, end, label in candidates:
+            resolved.add(start, end, label)  # (not added if it overlaps)
+
+        return [Span(self.doc, start, end, label=label) for start, end, label in resolved]
+
+    def commit(self):
+        ''' set doc.ents (once) '''
+        if (self._candidates or self._removed
+                or any(self.is_space(e.start, e.end) for e in self.doc.ents)):
+            self.doc.ents = self.resolve()
+        return self.doc
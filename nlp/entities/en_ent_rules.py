@@ -1,21 +1,17 @@
-import spacy
+from .rule_engine import EntityRules
 
 
-class EN_EntityRules(object):
+class EN_EntityRules(EntityRules):
     '''
-    match entities based on rules
+    match entities based on rules (nlp/entities/rules/en.jsonl)
     e.g: 
     - Hillary killed David.
         spacy: ( Hillary/ORG, killed, David/PERSON )
     - Hillary is the step mother of Chelsea.
         spacy: ( Hillary/ORG, step mother, Chelsea/ORG )
+    only ORG names are relabeled, next to a PERSON and a person-object verb
+    (killed, married, ...), a kinship noun or a title (mr., president, ...)
     '''
 
     name = 'en-ent-rules'
-
-    def __init__(self):
-        pass
-
-    def __call__(self, doc, entities):
-        # lilo:TODO
-        return doc
+    lang = 'en'
@@ -0,0 +1,13 @@
+from .rule_engine import EntityRules
+
+
+class ES_EntityRules(EntityRules):
+    '''
+    match entities based on rules (nlp/entities/rules/es.jsonl)
+    e.g:
+    - el presidente Sánchez
+        spacy: ( presidente, Sánchez/LOC )
+    '''
+
+    name = 'es-ent-rules'
+    lang = 'es'
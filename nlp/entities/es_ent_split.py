@@ -1,65 +1,67 @@
 import logging
-import spacy
-from spacy.tokens import Span
+import os
+from collections import OrderedDict
+import numpy as np
+from spacy.attrs import ORTH, ENT_IOB
+from .candidates import PRIORITY_SPLIT
+
+# tokens entities are split on (NLPY_ENT_SPLIT_TOKENS: space separated)
+SPLIT_TOKENS = tuple(os.environ.get('NLPY_ENT_SPLIT_TOKENS', 'y e ,').split())
+
+# ENT_IOB values
+_IOB_I = 1
 
 
 class ES_EntitySplit(object):
     '''
     split entities based on rules
-    e.g: 'Bill y Hillary Clinton' => 'Bill' + 'Hillary Clinton' (and remove label from 'y')
+    e.g: 'Bill y Hillary Clinton' => 'Bill' + 'Hillary Clinton' (and remove label from 'y')\n
+    works on the doc token arrays (no per entity/token python scanning)
+    and the candidates entities index
     '''
 
     name = 'es-ent-split'
 
-    def __init__(self):
-        pass
+    def __init__(self, split_tokens=SPLIT_TOKENS):
+        self.split_tokens = tuple(split_tokens)
+        self._split_ids = None  # orth ids (per vocab)
+        self._vocab = None
 
     def __call__(self, doc, entities):
-        ents_splited = []
-        ents_not_modified = []
-        for e in doc.ents:
-            if (len(e) < 3):
-                # include entity as is
-                ents_not_modified.append(e)
-                continue
+        n = len(doc)
+        if (n < 3):
+            return doc
+        a = doc.to_array([ORTH, ENT_IOB])
+        orth, iob = a[:, 0], a[:, 1]
 
-            # search for split_token
-            split_token = next(filter(lambda t: t.text == 'y', e), None)
-            if (None == split_token):
-                # include entity as is
-                ents_not_modified.append(e)
-                continue
+        # split tokens inside an entity (not its first token)
+        split = np.flatnonzero((iob == _IOB_I) & np.isin(orth, self._ids(doc.vocab)))
+        if (0 == len(split)):
+            return doc  # keep entities as is
 
-            # entity contains split_token
-            for span in self.split_entity(e, split_token):
-                ents_splited.append(span)
+        # the entities containing split tokens (see EntityCandidates.ents)
+        splits = OrderedDict()  # entity -> split positions
+        for i in split.tolist():
+            ent = entities.ents.containing(i)
+            if (None != ent and ent[0] < i):
+                splits.setdefault(ent, []).append(i)
 
-        if (len(ents_splited) > 0):
-            # debug print before
-            logging.debug('x:{} (doc.ents before): {}'.format(
-                self.name, doc.ents))
+        for (start, end, label), positions in splits.items():
+            if (end - start < 3):
+                continue  # keep entity as is
 
-            # update doc.ents
-            doc.ents = ents_not_modified + ents_splited
-
-            # debug print after
-            logging.debug('x:{} (doc.ents after): {}'.format(
-                self.name, doc.ents))
+            # entity contains split tokens: replace it with its parts
+            parts = list(zip([start] + [p + 1 for p in positions], positions + [end]))
+            logging.debug('x:%s split: %s -> %s', self.name, doc[start:end], parts)
+            entities.remove_range(start, end)
+            for s, e in parts:
+                entities.add(s, e, label, priority=PRIORITY_SPLIT)
 
         return doc
 
-    def split_entity(self, e, split_token):
-        ''' split entity(e) on token(t) '''
-        spans = []
-        start = e.start
-        for t in e:
-            if (t.lemma == split_token.lemma):
-                # create a span from start upto splitting token
-                spans.append(Span(e.doc, start, t.i, label=e.label))
-                # update start just after splitting token
-                start = t.i + 1
-            elif (t.i == e[-1].i):
-                # append last entity token
-                spans.append(Span(e.doc, start, t.i+1, label=e.label))
-
-        return spans
+    def _ids(self, vocab):
+        if (not vocab is self._vocab):
+            self._split_ids = np.array([vocab.strings.add(t) for t in self.split_tokens],
+                                       dtype='uint64')
+            self._vocab = vocab
+        return self._split_ids
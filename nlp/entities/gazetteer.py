@@ -0,0 +1,59 @@
+'''
+read term lists (gazetteers) from external files.
+
+supported formats:
+    .jsonl - one term per line: {"text": "Anchorage", "label": "GPE"}
+    .csv   - text,label (an optional "text,label" header line)
+
+the label is optional when a default label is given, e.g:
+    term_list = load_term_list(['places.jsonl', 'customers.csv'], label='ORG')
+    matcher = TermList_Matcher(nlp, term_list, attr='LOWER')
+'''
+
+import csv
+import io
+import json
+import os
+from collections import OrderedDict
+
+
+def read_terms(path, label=None):
+    ''' yields (text, label) from a .jsonl/.csv term file '''
+    ext = os.path.splitext(path)[1].lower()
+    with io.open(path, 'r', encoding='utf8') as f:
+        if (ext == '.csv'):
+            for i, row in enumerate(csv.reader(f)):
+                if (not row):
+                    continue
+                if (0 == i and [c.strip().lower() for c in row[:2]] == ['text', 'label']):
+                    continue  # header
+                text = row[0].strip()
+                term_label = row[1].strip() if (len(row) > 1 and row[1].strip()) else label
+                if (text and term_label):
+                    yield text, term_label
+        elif (ext in ('.jsonl', '.json')):
+            for line in f:
+                line = line.strip()
+                if (not line):
+                    continue
+                item = json.loads(line)
+                term_label = item.get('label', label)
+                if (item.get('text') and term_label):
+                    yield item['text'], term_label
+        else:
+            raise ValueError("unsupported term file: '%s' (.jsonl/.csv)" % path)
+
+
+def load_term_list(paths, label=None):
+    '''
+    read term files into a term list: [{'label': ..., 'terms': (...)}] \n
+    paths: a file path or a list of paths
+    '''
+    if isinstance(paths, str):
+        paths = [paths]
+    terms = OrderedDict()  # label -> terms
+    for path in paths:
+        for text, term_label in read_terms(path, label):
+            terms.setdefault(term_label, []).append(text)
+    return [{'label': term_label, 'terms': tuple(texts)}
+            for term_label, texts in terms.items()]
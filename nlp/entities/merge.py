@@ -0,0 +1,30 @@
+'''
+merge entities (and optionally noun chunks) into single tokens
+in one retokenization pass (span.merge() retokenizes the doc per span).
+'''
+
+from spacy.util import filter_spans
+from .span_index import SpanIndex
+
+
+def merge_spans(doc, spans):
+    ''' merge spans into single tokens (overlapping spans: the longest is merged) '''
+    spans = filter_spans(spans)
+    if spans:
+        with doc.retokenize() as retokenizer:
+            for span in spans:
+                retokenizer.merge(span)
+    return doc
+
+
+def merge_entities(doc, noun_chunks=False):
+    '''
+    merge doc entities into single tokens, and noun chunks (parsed docs)
+    that do not overlap an entity
+    '''
+    spans = list(doc.ents)
+    if (noun_chunks and doc.is_parsed):
+        ents = SpanIndex.from_doc(doc)
+        spans += [chunk for chunk in doc.noun_chunks
+                  if not ents.overlaps(chunk.start, chunk.end)]
+    return merge_spans(doc, spans)
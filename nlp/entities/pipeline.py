@@ -5,53 +5,163 @@ you can add entity extraction to nlp.pipeline using:
     pipeline = EntitiesPipeline()
     nlp.add_pipe(pipeline, after='ner')
 
-you can add your relation extrators (one or more) using:
+you can add your entity extrators (one or more) using:
     pipeline.add_pipe(YOUR_EntityExtractor())
 
+extractors are called with (doc, entities) and add candidates to
+entities (EntityCandidates), all candidates are resolved and
+committed to doc.ents once per doc.
+
 '''
 
+import json
+import os
 import spacy
-from spacy.tokens import Span
+from spacy.util import minibatch
 from .en_term_list import EN_TERM_LIST
 from .es_term_list import ES_TERM_LIST
 from .term_list_matcher import TermList_Matcher
+from .gazetteer import load_term_list
 from .en_ent_rules import EN_EntityRules
 from .es_ent_split import ES_EntitySplit
+from .es_ent_rules import ES_EntityRules
+from .candidates import EntityCandidates
+from .merge import merge_entities
+from ..registry import ComponentRegistry
+
+# entity extractors per language (followed by the term-list matcher)
+EXTRACTORS = {
+    'en': (EN_EntityRules,),
+    'es': (ES_EntitySplit, ES_EntityRules),
+}
+
+TERM_LISTS = {
+    'en': EN_TERM_LIST,
+    'es': ES_TERM_LIST,
+}
+
+
+def term_list_config(lang):
+    '''
+    term list for a language (built-in terms + term files) and matcher options.\n
+    NLPY_TERM_FILES_<LANG>: comma separated .jsonl/.csv term files (see gazetteer) \n
+    NLPY_TERM_ATTR: token attribute to match on (ORTH/LOWER/LEMMA, default: ORTH) \n
+    NLPY_TERM_MATCHER: matcher backend (phrase/index, default: phrase) \n
+    NLPY_TERM_STORE_<LANG>: a compiled term store file (see term_store)
+    '''
+    term_list = list(TERM_LISTS.get(lang, []))
+    files = os.environ.get('NLPY_TERM_FILES_%s' % lang.upper(), '')
+    files = [f.strip() for f in files.split(',') if f.strip()]
+    if files:
+        term_list += load_term_list(files)
+    options = {
+        'attr': os.environ.get('NLPY_TERM_ATTR', 'ORTH'),
+        'backend': os.environ.get('NLPY_TERM_MATCHER', 'phrase'),
+        'store': os.environ.get('NLPY_TERM_STORE_%s' % lang.upper()) or None,
+    }
+    return term_list, options
 
 
 class EntitiesPipeline(object):
     name = 'nlpy_entities'
-    pipe_ = []
-
-    def __init__(self, nlp, merge_entity_spans = False):
-        if (nlp.lang == 'en'):
-            self.add_pipe(EN_EntityRules())
-            self.add_pipe(TermList_Matcher(nlp, EN_TERM_LIST))
-        elif (nlp.lang == 'es'):
-            self.add_pipe(ES_EntitySplit())
-            self.add_pipe(TermList_Matcher(nlp, ES_TERM_LIST))
-        
-        # should we merge entities spans
+    requires = ()  # other components needed (see nlp.variants)
+    term_matcher = None
+
+    def __init__(self, nlp, merge_entity_spans = False, term_matcher = None,
+                 merge_noun_chunks = False):
+        '''
+        term_matcher: a pre-built TermList_Matcher (e.g: restored from a snapshot) \n
+        merge_noun_chunks: with merge_entity_spans, merge noun chunks too
+        '''
+        # components of this pipeline (for nlp.lang only)
+        self.pipe_ = ComponentRegistry(nlp.lang)
+        for extractor in EXTRACTORS.get(nlp.lang, ()):
+            self.add_pipe(extractor())
+        if (None == term_matcher):
+            # (term files are read only when not restored, e.g: from a snapshot)
+            term_list, options = term_list_config(nlp.lang)
+            if (term_list or options['store']):
+                term_matcher = TermList_Matcher(nlp, term_list, **options)
+        if term_matcher:
+            self.term_matcher = term_matcher
+            self.add_pipe(self.term_matcher)
+
+        if (nlp.lang == 'es' or merge_noun_chunks):
+            # compound expansion of term-list matches (es) / noun chunks use the parse
+            self.requires = ('parser',)
+
+        # should we merge entities spans (and noun chunks)
         self.merge_entity_spans = merge_entity_spans
+        self.merge_noun_chunks = merge_noun_chunks
 
     def __call__(self, doc):
 
-        entities = []
-        for c in self.pipe_:
+        entities = EntityCandidates(doc)
+        components = list(self.pipe_)
+        for c in components:
             doc = c(doc, entities)
+        self.pipe_.record(1, len(components))
 
-        #  add extracted entities to doc.ents
-        for e in entities:
-            start, end, label = e
-            span = Span(doc, start, end, label=label)
-            doc.ents = list(doc.ents) + [span]
+        return self._add_entities(doc, entities)
+
+    def pipe(self, docs, batch_size=1000):
+        '''
+        process docs in batches: components with a pipe() method
+        handle a whole batch at once (e.g: one matcher pass per batch)
+        '''
+        for batch in minibatch(docs, size=batch_size):
+            batch_entities = [EntityCandidates(doc) for doc in batch]
+            components = list(self.pipe_)
+            for c in components:
+                if hasattr(c, 'pipe'):
+                    batch = c.pipe(batch, batch_entities)
+                else:
+                    batch = [c(doc, entities)
+                             for doc, entities in zip(batch, batch_entities)]
+            self.pipe_.record(len(batch), len(batch) * len(components))
+            for doc, entities in zip(batch, batch_entities):
+                yield self._add_entities(doc, entities)
+
+    def _add_entities(self, doc, entities):
+        # resolve overlaps and set doc.ents (once)
+        entities.commit()
 
         # merge entities into one token? (default to False)
         if (self.merge_entity_spans):
-            for span in doc.ents:
-                span.merge()
+            merge_entities(doc, noun_chunks=self.merge_noun_chunks)
 
         return doc
 
     def add_pipe(self, component):
-        self.pipe_.append(component)
+        self.pipe_.add(component)
+
+    def get_pipe(self, name):
+        return self.pipe_.get(name)
+
+    def enable_pipe(self, name):
+        self.pipe_.enable(name)
+
+    def disable_pipe(self, name):
+        self.pipe_.disable(name)
+
+    def to_disk(self, path):
+        ''' save pipeline config and term-list matcher state '''
+        if (not os.path.exists(path)):
+            os.makedirs(path)
+        cfg = {'merge_entity_spans': self.merge_entity_spans,
+               'merge_noun_chunks': self.merge_noun_chunks}
+        if self.term_matcher:
+            cfg['term_matcher'] = self.term_matcher.to_dict()
+        with open(os.path.join(path, 'cfg.json'), 'w') as f:
+            json.dump(cfg, f, sort_keys=True, ensure_ascii=False)
+
+    @staticmethod
+    def from_disk(nlp, path):
+        ''' restore a pipeline saved by to_disk '''
+        with open(os.path.join(path, 'cfg.json'), 'r') as f:
+            cfg = json.load(f)
+        term_matcher = None
+        if ('term_matcher' in cfg):
+            term_matcher = TermList_Matcher.from_dict(nlp, cfg['term_matcher'])
+        return EntitiesPipeline(nlp, cfg['merge_entity_spans'], term_matcher,
+                                cfg.get('merge_noun_chunks', False))
@@ -0,0 +1,167 @@
+'''
+rule based entity (re)labeling: token patterns loaded from rule files,
+compiled into a single spacy Matcher and applied in one pass per doc.
+
+rule files (.jsonl), one rule per line:
+    {"id": "title-person", "label": "PERSON",
+     "pattern": [{"LOWER": {"IN": ["mr.", "mrs."]}}, {"ENT_TYPE": "ORG"}],
+     "target": [1, 2]}
+
+    id      - rule id (hit counters, see EntityRules.stats)
+    label   - entity label of the target
+    pattern - spacy Matcher token pattern
+    target  - optional [start, end] tokens of the match to label (python slice,
+              end may be null or negative), default: the whole match.
+              a target inside an existing entity labels the whole entity.
+
+the default rules of a language: nlp/entities/rules/<lang>.jsonl,
+or NLPY_ENT_RULES_<LANG>: comma separated rule files.
+'''
+
+import io
+import json
+import os
+from collections import Counter, OrderedDict
+from spacy.matcher import Matcher
+from logger import logger
+from .candidates import PRIORITY_RULES
+
+RULES_DIR = os.path.join(os.path.dirname(__file__), 'rules')
+
+# token attributes set by the tagger / parser
+_TAG_ATTRS = ('POS', 'TAG', 'LEMMA')
+_PARSE_ATTRS = ('DEP',)
+
+
+def rule_files(lang):
+    ''' rule files of a language (NLPY_ENT_RULES_<LANG> or the default rules) '''
+    files = os.environ.get('NLPY_ENT_RULES_%s' % lang.upper())
+    if files:
+        return [f.strip() for f in files.split(',') if f.strip()]
+    path = os.path.join(RULES_DIR, '%s.jsonl' % lang)
+    return [path] if os.path.isfile(path) else []
+
+
+def read_rules(paths):
+    ''' rules from .jsonl rule files '''
+    rules = OrderedDict()
+    for path in paths:
+        with io.open(path, 'r', encoding='utf8') as f:
+            for line in f:
+                line = line.strip()
+                if (not line or line.startswith('#')):
+                    continue
+                rule = json.loads(line)
+                if (rule['id'] in rules):
+                    raise ValueError("duplicate rule id: '%s' (%s)" % (rule['id'], path))
+                rules[rule['id']] = rule
+    return list(rules.values())
+
+
+class EntityRules(object):
+    '''
+    label entities based on rules (see rule_engine), all the rules of a
+    language are matched in a single pass
+    '''
+
+    name = 'ent-rules'
+    lang = None
+
+    def __init__(self, rules=None):
+        '''
+        rules: rule dicts (default: the rule files of the language)
+        '''
+        if (None == rules):
+            rules = read_rules(rule_files(self.lang)) if self.lang else []
+        self.rules = {}
+        self.matcher = None
+        self.hits = Counter()  # rule id -> hits
+        self.docs = 0
+        self._compile(rules)
+
+    def _compile(self, rules):
+        self.rules = OrderedDict((rule['id'], rule) for rule in rules)
+        self.matcher = _RuleMatcher() if rules else None
+        for rule in rules:
+            self.matcher.add(rule['id'], rule['pattern'])
+        if rules:
+            logger.debug('%s: compiled %d rules' % (self.name, len(rules)))
+
+    def __call__(self, doc, entities):
+        self.docs += 1
+        if (None == self.matcher):
+            return doc
+        matches = self.matcher(doc)  # (rules the doc has the attributes for)
+        if (not matches):
+            return doc
+
+        labeled = set()  # (rule id, start, end): a target is counted once
+        for rule_id, start, end in matches:
+            rule = self.rules[rule_id]
+            if rule.get('target'):
+                tokens = range(start, end)[slice(*rule['target'])]
+                if (0 == len(tokens)):
+                    continue
+                start, end = tokens[0], tokens[-1] + 1
+            # targets inside an entity label the whole entity
+            first, last = entities.ents.containing(start), entities.ents.containing(end - 1)
+            start, end = first[0] if first else start, last[1] if last else end
+            if ((rule_id, start, end) in labeled):
+                continue
+            labeled.add((rule_id, start, end))
+            entities.add(start, end, rule['label'], priority=PRIORITY_RULES)
+            self.hits[rule_id] += 1
+
+        return doc
+
+    def stats(self):
+        ''' per rule hits (rules that never fire can be pruned) '''
+        return {
+            'docs': self.docs,
+            'rules': OrderedDict((rule_id, self.hits[rule_id]) for rule_id in self.rules),
+            'unused': [rule_id for rule_id in self.rules if (0 == self.hits[rule_id])],
+        }
+
+
+class _RuleMatcher(object):
+    '''
+    spacy Matchers keyed by rule ids (the vocab is bound on first use):
+    rules with POS/TAG/LEMMA (DEP) patterns are matched on tagged (parsed) docs only
+    '''
+
+    def __init__(self):
+        self._patterns = OrderedDict()
+        self._needs = {}  # rule id -> (needs tags, needs parse)
+        self._matchers = {}  # (tagged, parsed) -> Matcher of the applicable rules
+        self._vocab = None
+
+    def add(self, rule_id, pattern):
+        attrs = set(attr.upper() for token in pattern for attr in token)
+        self._patterns[rule_id] = pattern
+        self._needs[rule_id] = (bool(attrs.intersection(_TAG_ATTRS)),
+                                bool(attrs.intersection(_PARSE_ATTRS)))
+        self._matchers = {}
+
+    def __call__(self, doc):
+        if (not doc.vocab is self._vocab):
+            self._matchers, self._vocab = {}, doc.vocab
+        key = (doc.is_tagged, doc.is_parsed)
+        if (not key in self._matchers):
+            self._matchers[key] = self._build(doc.vocab, *key)
+        matcher = self._matchers[key]
+        if (None == matcher):
+            return []
+        strings = doc.vocab.strings
+        return [(strings[match_id], start, end)
+                for match_id, start, end in matcher(doc)]
+
+    def _build(self, vocab, tagged, parsed):
+        matcher = None
+        for rule_id, pattern in self._patterns.items():
+            needs_tags, needs_parse = self._needs[rule_id]
+            if ((needs_tags and not tagged) or (needs_parse and not parsed)):
+                continue
+            if (None == matcher):
+                matcher = Matcher(vocab)
+            matcher.add(rule_id, None, pattern)
+        return matcher
@@ -0,0 +1,64 @@
+'''
+per doc index of non-overlapping token spans (e.g: doc.ents, resolved entities)
+with O(log n) overlap/containment queries (bisect over the sorted bounds).
+'''
+
+from bisect import bisect_left, bisect_right
+
+
+class SpanIndex(object):
+    '''
+    sorted, non-overlapping (start, end, label) token spans
+    '''
+
+    def __init__(self, spans=()):
+        self._starts = []
+        self._ends = []
+        self._labels = []
+        for start, end, label in sorted(spans):
+            self.add(start, end, label)
+
+    @staticmethod
+    def from_doc(doc):
+        return SpanIndex((e.start, e.end, e.label) for e in doc.ents)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return zip(self._starts, self._ends, self._labels)
+
+    def overlaps(self, start, end):
+        ''' does [start, end) overlap a span '''
+        k = bisect_right(self._ends, start)
+        return k < len(self._starts) and self._starts[k] < end
+
+    def overlapping(self, start, end):
+        ''' spans overlapping [start, end) '''
+        k = bisect_right(self._ends, start)
+        while (k < len(self._starts) and self._starts[k] < end):
+            yield self._starts[k], self._ends[k], self._labels[k]
+            k += 1
+
+    def containing(self, i):
+        ''' the span of token i (or None) '''
+        k = bisect_right(self._ends, i)
+        if (k < len(self._starts) and self._starts[k] <= i):
+            return self._starts[k], self._ends[k], self._labels[k]
+        return None
+
+    def covers(self, start, end, label=None):
+        ''' is [start, end) inside a span (with the given label) '''
+        span = self.containing(start)
+        return (None != span and span[1] >= end
+                and (None == label or span[2] == label))
+
+    def add(self, start, end, label):
+        ''' add a span, returns False (not added) if it overlaps a span '''
+        if (end <= start or self.overlaps(start, end)):
+            return False
+        k = bisect_left(self._starts, start)
+        self._starts.insert(k, start)
+        self._ends.insert(k, end)
+        self._labels.insert(k, label)
+        return True
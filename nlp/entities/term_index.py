@@ -0,0 +1,128 @@
+'''
+compact term matcher backend (an alternative to spacy's PhraseMatcher).
+
+patterns (token attr ids, see TermList_Matcher) of all labels are kept in a dict
+of tuples (pattern -> label), indexed by their first token (first token id ->
+pattern lengths), a match is a dict lookup of the doc token ids slice per
+candidate length.\n
+the pattern tuples are shared with the TermList_Matcher terms cache, so the
+index only adds hash table entries (PhraseMatcher allocates a map per trie node
+and keeps its own copy of the patterns), and copying the index (see
+TermList_Matcher.update) only copies the hash tables.\n
+matches are the same as PhraseMatcher's: (label, start, end), all matches
+(including nested ones) ordered by start and length.
+'''
+
+import copy
+
+
+class TermIndex(object):
+    '''
+    token-id sequence index (same add/remove/__call__/pipe as PhraseMatcher)
+    '''
+
+    def __init__(self, vocab, attr='ORTH'):
+        self.vocab = vocab
+        self.attr = vocab.strings[attr.upper()]
+        self.patterns = {}  # pattern -> label id (a tuple of label ids: several labels)
+        self.lengths = {}  # first token id -> pattern lengths (ascending)
+        self._lengths = {}  # interned lengths tuples
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def __contains__(self, label):
+        key = self.vocab.strings[label]
+        return any(key == labels or (isinstance(labels, tuple) and key in labels)
+                   for labels in self.patterns.values())
+
+    def copy(self):
+        ''' a copy to update (the pattern tuples are shared) '''
+        index = copy.copy(self)
+        index.patterns = dict(self.patterns)
+        index.lengths = dict(self.lengths)
+        index._lengths = dict(self._lengths)
+        return index
+
+    def add(self, label, on_match, *patterns):
+        ''' same signature as PhraseMatcher.add (patterns: attr id sequences) '''
+        key = self.vocab.strings.add(label)
+        for pattern in patterns:
+            pattern = tuple(pattern)
+            if (not pattern):
+                continue
+            labels = self.patterns.get(pattern)
+            if (None == labels):
+                self.patterns[pattern] = key
+                self._add_length(pattern)
+            elif (isinstance(labels, tuple)):
+                if (not key in labels):
+                    self.patterns[pattern] = labels + (key,)
+            elif (labels != key):
+                self.patterns[pattern] = (labels, key)
+
+    def remove(self, label, patterns=None):
+        '''
+        remove the patterns of a label (see PhraseMatcher.remove) \n
+        patterns: the label patterns, if known (only these are looked up,
+        lengths are kept: a stale length is a failed lookup)
+        '''
+        key = self.vocab.strings[label]
+        if (None != patterns):
+            for pattern in patterns:
+                self._remove_pattern(tuple(pattern), key)
+            return
+        patterns = {}
+        for pattern, labels in self.patterns.items():
+            if (isinstance(labels, tuple)):
+                labels = tuple(l for l in labels if l != key)
+                labels = labels[0] if (1 == len(labels)) else labels
+            if (labels != key):
+                patterns[pattern] = labels
+        self.patterns = patterns
+        self.lengths = {}
+        for pattern in patterns:
+            self._add_length(pattern)
+
+    def _remove_pattern(self, pattern, key):
+        labels = self.patterns.get(pattern)
+        if (labels == key):
+            del self.patterns[pattern]
+        elif (isinstance(labels, tuple) and key in labels):
+            labels = tuple(l for l in labels if l != key)
+            self.patterns[pattern] = labels[0] if (1 == len(labels)) else labels
+
+    def _add_length(self, pattern):
+        lengths = self.lengths.get(pattern[0], ())
+        if (not len(pattern) in lengths):
+            lengths = tuple(sorted(lengths + (len(pattern),)))
+            self.lengths[pattern[0]] = self._lengths.setdefault(lengths, lengths)
+
+    def __call__(self, doc):
+        matches = []
+        if (0 == len(doc)):
+            return matches
+        ids = doc.to_array(self.attr).tolist()
+        n = len(ids)
+        for start, token in enumerate(ids):
+            lengths = self.lengths.get(token)
+            if (None == lengths):
+                continue
+            for length in lengths:
+                end = start + length
+                if (end > n):
+                    break
+                labels = self.patterns.get(tuple(ids[start:end]))
+                if (None == labels):
+                    continue
+                if (isinstance(labels, tuple)):
+                    matches += [(label, start, end) for label in labels]
+                else:
+                    matches.append((labels, start, end))
+        return matches
+
+    def pipe(self, docs, batch_size=1000, return_matches=False):
+        ''' same as PhraseMatcher.pipe '''
+        for doc in docs:
+            matches = self(doc)
+            yield (doc, matches) if return_matches else doc
@@ -1,49 +1,380 @@
+import threading
+import timeit
+from collections import OrderedDict, namedtuple
 import spacy
 from spacy.tokens import Doc
 from spacy.tokens import Span
 from spacy.matcher import PhraseMatcher
+from spacy.util import minibatch
+from spacy.attrs import IS_SPACE
+from logger import logger
+from .candidates import PRIORITY_TERM_LIST
+from .gazetteer import load_term_list
+from .term_index import TermIndex
+from .term_store import TermStore, compile_store
+from ..memory import rss_bytes, format_bytes
+
+
+class LabelMatchers(object):
+    '''
+    a PhraseMatcher per label (same add/remove/__call__/pipe as PhraseMatcher):
+    a PhraseMatcher can't be copied, a copy shares the label matchers and
+    an update replaces the matcher of the changed label only
+    '''
+
+    def __init__(self, vocab, attr='ORTH'):
+        self.vocab = vocab
+        self.attr = attr
+        self.matchers = OrderedDict()  # label -> PhraseMatcher
+
+    def __len__(self):
+        return sum(len(m) for m in self.matchers.values())
+
+    def __contains__(self, label):
+        return label in self.matchers
+
+    def copy(self):
+        ''' a copy to update (the label matchers are shared, see remove) '''
+        matchers = LabelMatchers(self.vocab, self.attr)
+        matchers.matchers = OrderedDict(self.matchers)
+        return matchers
+
+    def add(self, label, on_match, *patterns):
+        ''' same signature as PhraseMatcher.add (patterns: attr id sequences) '''
+        matcher = self.matchers.get(label)
+        if (None == matcher):
+            matcher = self.matchers[label] = PhraseMatcher(self.vocab, attr=self.attr)
+        matcher.add(label, on_match, *patterns)
+
+    def remove(self, label, patterns=None):
+        ''' remove the label matcher (all its patterns) '''
+        self.matchers.pop(label, None)
+
+    def __call__(self, doc):
+        matches = []
+        for matcher in self.matchers.values():
+            matches += matcher(doc)
+        matches.sort(key=lambda m: (m[1], m[2]))  # (as a single PhraseMatcher)
+        return matches
+
+    def pipe(self, docs, batch_size=1000, return_matches=False):
+        ''' same as PhraseMatcher.pipe '''
+        for doc in docs:
+            matches = self(doc)
+            yield (doc, matches) if return_matches else doc
+
+
+# matcher backends: (vocab, attr) -> matcher (see PhraseMatcher.add/remove/__call__/pipe)
+MATCHERS = {
+    'phrase': LabelMatchers,
+    'index': TermIndex,
+}
 
 
 class TermList_Matcher(object):
     '''
-    match entities based on terminology list and an entity labels.
+    match entities based on terminology list and an entity labels.\n
+    all labels share a single matcher state (index: one pass per doc, phrase:
+    a PhraseMatcher per label).\n
+    terms can be added/removed/replaced while serving (see update): an update
+    tokenizes only new terms, updates a copy of the matcher (the patterns of the
+    changed label only) and swaps the matcher state at once, in-flight matching
+    keeps using the state it started with.
     '''
 
     name = 'term-list-ent-matcher'
 
-    def __init__(self, nlp, term_list):
-        self.matcher = PhraseMatcher(nlp.vocab)
+    def __init__(self, nlp, term_list, patterns=None, attr='ORTH', batch_size=10000,
+                 backend='phrase', store=None):
+        '''
+        term_list: [{'label': ..., 'terms': (...)}] \n
+        patterns: attr ids per term (in term_list order),
+        e.g: restored from a snapshot (see to_dict/from_dict) \n
+        attr: token attribute to match on (ORTH/LOWER/LEMMA) \n
+        batch_size: terms tokenized/added per batch \n
+        backend: matcher backend (see MATCHERS): phrase (spacy's PhraseMatcher per label),
+        index (TermIndex, less memory/build time with very large term lists) \n
+        store: a compiled term store file (see term_store), matched in addition
+        to term_list (read-only, shared by processes)
+        '''
+        if (not backend in MATCHERS):
+            raise ValueError("unknown term matcher backend: '%s' (%s)" % (
+                backend, ', '.join(MATCHERS)))
+        self.nlp = nlp
+        self.attr = attr.upper()
+        self.backend = backend
+        self.store = TermStore(store, nlp.vocab) if store else None
+        self.batch_size = batch_size
+        self._lock = threading.Lock()  # serializes updates
+
+        start = timeit.default_timer()
+        rss = rss_bytes()
+        terms = OrderedDict()  # label -> {text: pattern}
+        i = 0
         for item in term_list:
-            label = item['label']
-            terms = item['terms']
-            patterns = [nlp(text) for text in terms]
-            self.matcher.add(label, None, *patterns)
+            texts = item['terms']
+            if (None == patterns):
+                term_patterns = self._make_patterns(texts)
+            else:
+                term_patterns = patterns[i:i + len(texts)]
+            i += len(texts)
+            label_terms = terms.setdefault(item['label'], OrderedDict())
+            for text, pattern in zip(texts, term_patterns):
+                label_terms[text] = tuple(pattern)
+        self._state = _TermState(self._build(terms), terms)
+
+        self.stats = {
+            'terms': sum(len(t) for t in terms.values()),
+            'labels': len(terms),
+            'build_time': timeit.default_timer() - start,
+            'memory': max(0, rss_bytes() - rss),  # approximate
+            'updates': 0,
+            'backend': backend,
+            'store_terms': len(self.store) if self.store else 0,
+        }
+        if (i >= batch_size):
+            logger.info('Built term-list matcher: %d terms, %d labels (%.2f sec, %s)' % (
+                i, self.stats['labels'], self.stats['build_time'],
+                format_bytes(self.stats['memory'])))
+
+    @staticmethod
+    def compile_store(nlp, term_list, path, attr='ORTH'):
+        ''' compile term_list into a term store file (see term_store) '''
+        matcher = TermList_Matcher(nlp, [], attr=attr)
+        texts = [text for item in term_list for text in item['terms']]
+        compile_store(path, term_list, matcher._make_patterns(texts), attr)
+
+    @property
+    def term_list(self):
+        return [{'label': label, 'terms': tuple(terms)}
+                for label, terms in self._state.terms.items()]
+
+    @property
+    def labels(self):
+        return list(self._state.terms)
+
+    def _build(self, terms, matcher=None):
+        ''' add the given terms {label: {text: pattern}} to a (new) matcher '''
+        if (None == matcher):
+            matcher = MATCHERS[self.backend](self.nlp.vocab, self.attr)
+        for label, label_terms in terms.items():
+            for batch in minibatch(label_terms.values(), size=self.batch_size):
+                matcher.add(label, None, *batch)
+        return matcher
+
+    def _updated(self, state, all_terms, label, removed, added):
+        '''
+        a copy of the state matcher with the label changes: the index backend
+        copies its hash tables and applies the removed/added patterns, the phrase
+        backend (a PhraseMatcher can't be copied) shares the matchers of the other
+        labels and rebuilds the label matcher from its cached patterns (no tokenization)
+        '''
+        matcher = state.matcher.copy()
+        if (isinstance(matcher, TermIndex)):
+            matcher.remove(label, removed)
+        else:
+            matcher.remove(label)
+            added = all_terms.get(label, {}).values()
+        for batch in minibatch(added, size=self.batch_size):
+            matcher.add(label, None, *batch)
+        return matcher
+
+    def update(self, label, add=(), remove=(), replace=None):
+        '''
+        atomically update the terms of a label: \n
+        add/remove: terms to add/remove \n
+        replace: the new terms of the label (an empty list removes the label) \n
+        returns the number of terms of the label.\n
+        cost: tokenizing the new terms and a matcher copy (phrase: re-adding the
+        cached patterns of the label, index: copying its hash tables)
+        '''
+        with self._lock:
+            start = timeit.default_timer()
+            state = self._state
+            old_terms = state.terms.get(label, OrderedDict())
+            if (None != replace):
+                terms = OrderedDict((t, old_terms.get(t)) for t in replace)
+                removed = [p for t, p in old_terms.items() if (not t in terms)]
+                new_texts = [t for t, p in terms.items() if (None == p)]
+            else:
+                terms = OrderedDict(old_terms)
+                removed = [terms.pop(t) for t in OrderedDict.fromkeys(remove) if (t in terms)]
+                new_texts = [t for t in OrderedDict.fromkeys(add) if (not t in old_terms)]
+            if (not removed and not new_texts):
+                return len(terms)  # no change
+
+            # tokenize only new terms
+            for t, pattern in zip(new_texts, self._make_patterns(new_texts)):
+                terms[t] = tuple(pattern)
+            added = [terms[t] for t in new_texts]
+            if removed:
+                # (different texts may have the same pattern, e.g: matching on LOWER)
+                kept = set(terms.values())
+                removed = [p for p in removed if (not p in kept)]
+
+            all_terms = OrderedDict(state.terms)
+            if terms:
+                all_terms[label] = terms
+            else:
+                all_terms.pop(label, None)
+            matcher = self._updated(state, all_terms, label, removed, added)
+            self._state = _TermState(matcher, all_terms)  # swap
+
+            self.stats['terms'] = sum(len(t) for t in all_terms.values())
+            self.stats['labels'] = len(all_terms)
+            self.stats['updates'] += 1
+            logger.info("Updated term-list label '%s': %d terms (+%d/-%d, %.2f sec)" % (
+                label, len(terms), len(new_texts),
+                len(old_terms) + len(new_texts) - len(terms),
+                timeit.default_timer() - start))
+            return len(terms)
+
+    def add_terms(self, label, terms):
+        return self.update(label, add=terms)
+
+    def remove_terms(self, label, terms):
+        return self.update(label, remove=terms)
+
+    def replace_terms(self, label, terms):
+        return self.update(label, replace=terms)
+
+    def remove_label(self, label):
+        return self.update(label, replace=())
+
+    @staticmethod
+    def from_files(nlp, paths, label=None, **kwargs):
+        ''' build a matcher from .jsonl/.csv term files (see gazetteer) '''
+        return TermList_Matcher(nlp, load_term_list(paths, label), **kwargs)
+
+    def _make_patterns(self, texts):
+        '''
+        yields a pattern (attr ids) per term, without running the pipeline.\n
+        plain words (alphabetic, not a tokenizer exception) are looked up directly
+        when matching on ORTH/LOWER (no tokenizer cost), other terms are
+        tokenized (and tagged when matching on LEMMA) a batch at a time \n
+        raises ValueError for a term that can't be tokenized (e.g: empty)
+        '''
+        for batch in minibatch(texts, size=self.batch_size):
+            batch = [text.split() for text in batch]
+            patterns = [self._hash_words(words) for words in batch]
+            slow = [i for i, pattern in enumerate(patterns) if (None == pattern)]
+            if slow:
+                tokenized = self._tokenize([' '.join(batch[i]) for i in slow])
+                for i, pattern in zip(slow, tokenized):
+                    patterns[i] = pattern
+            for pattern in patterns:
+                yield pattern
+
+    def _hash_words(self, words):
+        '''
+        attr ids of plain words (as the tokenizer would produce), or None.\n
+        ids are string store ids, not hashes: spacy's symbols (e.g: 'root', 'mark', 'X')
+        have fixed small ids (see doc.to_array)
+        '''
+        if (not self.attr in ('ORTH', 'LOWER')):
+            return None
+        rules = self.nlp.tokenizer.rules
+        for w in words:
+            if (not w.isalpha() or w in rules):
+                return None
+        strings = self.nlp.vocab.strings
+        if (self.attr == 'LOWER'):
+            return [strings.add(w.lower()) for w in words]
+        return [strings.add(w) for w in words]
+
+    def _tokenize(self, texts):
+        '''
+        attr ids per text: the texts are tokenized as a single newline separated
+        text (spacy tokenizes each whitespace separated substring independently)
+        '''
+        attr_id = self.nlp.vocab.strings[self.attr]
+        doc = self.nlp.tokenizer('\n'.join(texts))
+        if (self.attr == 'LEMMA' and self.nlp.has_pipe('tagger')):
+            doc = self.nlp.get_pipe('tagger')(doc)
+        patterns = [[]]
+        for value, is_space in doc.to_array([attr_id, IS_SPACE]):
+            if is_space:
+                patterns.append([])
+            else:
+                patterns[-1].append(int(value))
+        if (len(patterns) != len(texts)):
+            raise ValueError('term tokenization mismatch: %r' % self._bad_term(texts))
+        return patterns
+
+    def _bad_term(self, texts):
+        ''' the first term that is not tokenized into (non-space) tokens '''
+        for text in texts:
+            doc = self.nlp.tokenizer(text)
+            if (0 == len(doc) or any(t.is_space for t in doc)):
+                return text
+        return None
+
+    def to_dict(self):
+        ''' serializable matcher state (term list and patterns) '''
+        state = self._state
+        return {
+            'term_list': [{'label': label, 'terms': list(terms)}
+                          for label, terms in state.terms.items()],
+            'patterns': [list(pattern) for terms in state.terms.values()
+                         for pattern in terms.values()],
+            'attr': self.attr,
+            'backend': self.backend,
+            'store': self.store.path if self.store else None,
+        }
+
+    @staticmethod
+    def from_dict(nlp, data):
+        ''' restore a matcher from to_dict() (no tokenization of the terms) '''
+        if (not 'attr' in data):
+            return TermList_Matcher(nlp, data['term_list'])  # old format (words)
+        return TermList_Matcher(nlp, data['term_list'], data['patterns'],
+                                attr=data['attr'],
+                                backend=data.get('backend', 'phrase'),
+                                store=data.get('store'))
+
+    def match(self, doc, state=None):
+        ''' (label, start, end) matches of all labels '''
+        state = state or self._state
+        matches = state.matcher(doc)
+        if self.store:
+            matches += self.store.match(doc)
+        return matches
 
     def __call__(self, doc, entities):
-        spans = []
-        matches = self.matcher(doc)
+        return self._add_matches(doc, self.match(doc), entities)
+
+    def pipe(self, docs, entities):
+        '''
+        match a batch of docs (entities: per doc entities lists),
+        the matcher pipe() with the same matcher state for the whole batch,
+        the term store matches all the batch docs in one pass
+        '''
+        state = self._state
+        matched = state.matcher.pipe(docs, batch_size=max(1, len(docs)), return_matches=True)
+        stored = self.store.pipe(docs) if self.store else [[] for _ in docs]
+        for (doc, matches), store_matches, doc_entities in zip(matched, stored, entities):
+            self._add_matches(doc, matches + store_matches, doc_entities)
+        return docs
+
+    def _add_matches(self, doc, matches, entities):
         for label, start, end in matches:
-            span = doc[start:end]
-            if (span[0].ent_type == label):  # if not already labeled
+            if entities.ents.covers(start, end, label):  # if not already labeled
                 continue
 
             # es only: try extending the match (compound)
             compound_expanded = False
-            if (span.root.lang_ == 'es'):
-                span = self._try_expand_compound(span, label)
+            if (doc.lang_ == 'es'):
+                span = self._try_expand_compound(doc[start:end], label, entities)
                 if span:
-                    spans.append(span)
+                    entities.add_span(span, priority=PRIORITY_TERM_LIST)
                     compound_expanded = True
 
             if (False == compound_expanded):
-                span = Span(doc, start, end, label=label)
-                spans.append(span)
+                entities.add(start, end, label, priority=PRIORITY_TERM_LIST)
 
-        if (len(spans) > 0):
-            doc.ents = list(doc.ents) + spans
         return doc
 
-    def _try_expand_compound(self, span, label):
+    def _try_expand_compound(self, span, label, entities):
         # try extending the match (compound)
         # either the match
         compound = span[0] if span[0].dep_ == 'compound' else None
@@ -62,8 +393,16 @@ class TermList_Matcher(object):
                     compound_end = max(compound_end, t.i)
 
         if (compound_start >= 0):
+            # do not expand over other entities (another label, outside the match)
+            for start, end, other in entities.ents.overlapping(compound_start, compound_end + 1):
+                if (other != label and (start < span.start or end > span.end)):
+                    return None
             compound_span = Span(span.doc, compound_start,
                                  compound_end+1, label=label)
             return compound_span
 
         return None
+
+
+# the matcher of all labels and the terms {label: {text: pattern}} (replaced, never modified)
+_TermState = namedtuple('_TermState', ['matcher', 'terms'])
@@ -0,0 +1,205 @@
+'''
+compiled, read-only term list (gazetteer) store, shared by processes via mmap.
+
+a term is a token attr ids sequence (see TermList_Matcher), stored as a 64 bit
+hash of the sequence. the file is opened with mmap (read-only, shared), so all
+the worker processes on a node use a single physical copy (the page cache), and
+opening a store does not read or build anything.
+
+layout (little endian):
+    magic       8 bytes  - NLPYTRM1
+    meta size   uint64
+    meta        json     - attr, labels, sizes (padded to 8 bytes)
+    firsts      uint64[] - sorted first token ids
+    lengths     uint64[] - per first token: term lengths bitmask (bit n-1: n tokens)
+    keys        uint64[] - sorted term hashes
+    labels      uint32[] - per key: index in meta labels
+
+compile a store from term files (from the repository root):
+    python -m nlp.entities.term_store en terms.jsonl terms.gaz --attr LOWER
+
+use it: TermList_Matcher(nlp, term_list, store='terms.gaz')
+or: NLPY_TERM_STORE_EN=terms.gaz
+'''
+
+import argparse
+import io
+import json
+import mmap
+import struct
+import numpy as np
+from logger import logger
+
+MAGIC = b'NLPYTRM1'
+MAX_LENGTH = 64  # max term tokens (lengths bitmask)
+
+_SEED = 0xcbf29ce484222325
+_PRIME = 0x100000001b3
+_MASK = 0xffffffffffffffff
+
+
+def term_hash(pattern):
+    ''' 64 bit hash of a token ids sequence (see TermStore.match) '''
+    h = _SEED
+    for t in pattern:
+        h = ((h ^ t) * _PRIME) & _MASK
+    return h
+
+
+def compile_store(path, term_list, patterns, attr):
+    '''
+    write a store: \n
+    term_list: [{'label': ..., 'terms': (...)}] \n
+    patterns: attr ids per term (in term_list order, see TermList_Matcher) \n
+    attr: the token attribute of the patterns (ORTH/LOWER/LEMMA)
+    '''
+    labels = []
+    keys, key_labels, firsts = [], [], {}
+    patterns = iter(patterns)
+    skipped = 0
+    for item in term_list:
+        if (not item['label'] in labels):
+            labels.append(item['label'])
+        label = labels.index(item['label'])
+        for _ in item['terms']:
+            pattern = next(patterns)
+            if (not pattern or len(pattern) > MAX_LENGTH):
+                skipped += 1
+                continue
+            keys.append(term_hash(pattern))
+            key_labels.append(label)
+            firsts[pattern[0]] = firsts.get(pattern[0], 0) | (1 << (len(pattern) - 1))
+    if skipped:
+        logger.warning('Term store: skipped %d terms (empty or over %d tokens)' % (
+            skipped, MAX_LENGTH))
+
+    keys = np.array(keys, dtype='<u8')
+    key_labels = np.array(key_labels, dtype='<u4')
+    order = np.lexsort((key_labels, keys))
+    keys, key_labels = keys[order], key_labels[order]
+    # unique (key, label)
+    if len(keys):
+        unique = np.ones(len(keys), dtype=bool)
+        unique[1:] = (keys[1:] != keys[:-1]) | (key_labels[1:] != key_labels[:-1])
+        keys, key_labels = keys[unique], key_labels[unique]
+    first_ids = np.array(sorted(firsts), dtype='<u8')
+    lengths = np.array([firsts[t] for t in first_ids.tolist()], dtype='<u8')
+
+    meta = json.dumps({'attr': attr.upper(), 'labels': labels,
+                       'firsts': len(first_ids), 'keys': len(keys)}).encode('utf8')
+    meta += b' ' * (-len(meta) % 8)
+    with io.open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(meta)))
+        f.write(meta)
+        for array in (first_ids, lengths, keys, key_labels):
+            f.write(array.tobytes())
+    logger.info("Compiled term store '%s': %d terms, %d labels" % (
+        path, len(keys), len(labels)))
+
+
+class TermStore(object):
+    '''
+    read-only, memory mapped term store (see compile_store)
+    '''
+
+    def __init__(self, path, vocab):
+        self.path = path
+        with io.open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if (self._mmap[:len(MAGIC)] != MAGIC):
+            raise ValueError("not a term store: '%s'" % path)
+        offset = len(MAGIC)
+        meta_size = struct.unpack_from('<Q', self._mmap, offset)[0]
+        offset += 8
+        meta = json.loads(self._mmap[offset:offset + meta_size].decode('utf8'))
+        offset += meta_size
+
+        self.attr = meta['attr']
+        self.labels = meta['labels']
+        self._attr_id = vocab.strings[self.attr]
+        self._label_ids = [vocab.strings.add(l) for l in self.labels]
+        arrays = []
+        for dtype, count in (('<u8', meta['firsts']), ('<u8', meta['firsts']),
+                             ('<u8', meta['keys']), ('<u4', meta['keys'])):
+            arrays.append(np.frombuffer(self._mmap, dtype=dtype, count=count,
+                                        offset=offset))
+            offset += arrays[-1].nbytes
+        self.firsts, self.lengths, self.keys, self.key_labels = arrays
+
+    def __len__(self):
+        return len(self.keys)
+
+    def match(self, doc):
+        ''' (label, start, end) matches, ordered by start and length '''
+        return self.pipe([doc])[0]
+
+    def pipe(self, docs):
+        '''
+        matches of each of the docs: a single pass over the token ids of all the
+        docs (concatenated, windows do not cross doc boundaries)
+        '''
+        docs = list(docs)
+        results = [[] for _ in docs]
+        sizes = [len(doc) for doc in docs]
+        n = sum(sizes)
+        if (0 == n or 0 == len(self.firsts)):
+            return results
+        ids = np.concatenate([doc.to_array(self._attr_id).astype('u8')
+                              for doc in docs if len(doc)])
+        offsets = np.cumsum([0] + sizes)  # doc starts
+        ends = np.repeat(offsets[1:], sizes)  # per token: the end of its doc
+        pos = np.minimum(np.searchsorted(self.firsts, ids), len(self.firsts) - 1)
+        masks = np.where(self.firsts[pos] == ids, self.lengths[pos], np.uint64(0))
+        any_mask = int(np.bitwise_or.reduce(masks))
+        if (0 == any_mask):
+            return results
+
+        h = np.full(n, _SEED, dtype='u8')
+        prime = np.uint64(_PRIME)
+        for length in range(1, min(any_mask.bit_length(), max(sizes)) + 1):
+            count = n - length + 1  # windows of this length
+            h = (h[:count] ^ ids[length - 1:]) * prime  # (wraps around)
+            starts = np.nonzero(((masks[:count] >> np.uint64(length - 1)) & np.uint64(1)).astype(bool)
+                                & (np.arange(count) + length <= ends[:count]))[0]
+            if (0 == len(starts)):
+                continue
+            keys = h[starts]
+            lo = np.searchsorted(self.keys, keys, side='left')
+            hi = np.searchsorted(self.keys, keys, side='right')
+            found = np.nonzero(hi > lo)[0]
+            if (0 == len(found)):
+                continue
+            doc_ids = np.searchsorted(offsets, starts[found], side='right') - 1
+            for d, start, i, j in zip(doc_ids.tolist(), starts[found].tolist(),
+                                      lo[found].tolist(), hi[found].tolist()):
+                start -= int(offsets[d])
+                for label in self.key_labels[i:j].tolist():
+                    results[d].append((self._label_ids[label], start, start + length))
+        for matches in results:
+            matches.sort(key=lambda m: (m[1], m[2]))
+        return results
+
+    def close(self):
+        self.firsts = self.lengths = self.keys = self.key_labels = None
+        self._mmap.close()
+
+
+if __name__ == '__main__':
+    _argparser = argparse.ArgumentParser(
+        description='compile term files (.jsonl/.csv) into a term store.')
+    _argparser.add_argument('model', type=str, help='model (tokenizer) to use (e.g: en/es)')
+    _argparser.add_argument('terms', type=str, nargs='+', help='term files')
+    _argparser.add_argument('path', type=str, help='term store file')
+    _argparser.add_argument('-a', '--attr', type=str, default='ORTH',
+                            help='token attribute to match on (ORTH/LOWER/LEMMA)')
+    _argparser.add_argument('-l', '--label', type=str, default=None,
+                            help='default label (terms without a label)')
+    args = _argparser.parse_args()
+
+    import spacy
+    from .gazetteer import load_term_list
+    from .term_list_matcher import TermList_Matcher
+    nlp = spacy.load(args.model)
+    term_list = load_term_list(args.terms, args.label)
+    TermList_Matcher.compile_store(nlp, term_list, args.path, attr=args.attr)
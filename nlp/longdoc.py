@@ -0,0 +1,120 @@
+'''
+long document mode: split a (normalized) text into chunks on paragraph
+(or sentence) boundaries, process the chunks (optionally in parallel)
+and stitch the entities/relations back with document character offsets.
+
+e.g:
+    result = Nlpy.process_long(text, 'en', max_chars=100000, n_process=4)
+    for e in result.entities:
+        print(e.text, e.start_char, e.end_char, e.label)
+'''
+
+import re
+from collections import deque
+from .json.json_model import Document, Entity, Relation, Span
+
+# default max chunk size (chars), well below spacy's nlp.max_length
+MAX_CHUNK_CHARS = 100000
+
+_PARAGRAPH = re.compile(r'\n\n+')
+_SENTENCE = re.compile(r'(?<=[.!?])\s+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _split(text, start, end, regex):
+    ''' contiguous (start, end) pieces of text[start:end], separators kept at the end of a piece '''
+    for m in regex.finditer(text, start, end):
+        if (m.end() > start):
+            yield start, m.end()
+            start = m.end()
+    if (end > start):
+        yield start, end
+
+
+def _hard_split(text, start, end, max_chars):
+    ''' split on the last whitespace before max_chars (or at max_chars) '''
+    while (end - start > max_chars):
+        split = start + max_chars
+        ws = None
+        for m in _WHITESPACE.finditer(text, start + 1, split):
+            ws = m
+        if ws:
+            split = ws.end()
+        yield start, split
+        start = split
+    yield start, end
+
+
+def _pieces(text, max_chars):
+    for p_start, p_end in _split(text, 0, len(text), _PARAGRAPH):
+        if (p_end - p_start <= max_chars):
+            yield p_start, p_end
+            continue
+        # paragraph too long: split on sentences
+        for s_start, s_end in _split(text, p_start, p_end, _SENTENCE):
+            if (s_end - s_start <= max_chars):
+                yield s_start, s_end
+            else:
+                for piece in _hard_split(text, s_start, s_end, max_chars):
+                    yield piece
+
+
+def split_chunks(text, max_chars=MAX_CHUNK_CHARS):
+    '''
+    yields (offset, chunk): chunks of up to max_chars,
+    made of whole paragraphs (or sentences when a paragraph is too long)
+    '''
+    chunk_start = chunk_end = 0
+    for start, end in _pieces(text, max_chars):
+        if (end - chunk_start > max_chars and chunk_end > chunk_start):
+            yield chunk_start, text[chunk_start:chunk_end]
+            chunk_start = chunk_end
+        chunk_end = end
+    if (chunk_end > chunk_start):
+        yield chunk_start, text[chunk_start:chunk_end]
+
+
+def _entity(span, offset):
+    if (None == span):
+        return None
+    return Entity(span.text, span.start_char + offset,
+                  span.end_char + offset, span[0].ent_type_)
+
+
+def _span(span, offset):
+    if (None == span):
+        return None
+    return Span(span.text, span.start_char + offset, span.end_char + offset)
+
+
+def process_long(nlp_pipe, text, max_chars=MAX_CHUNK_CHARS, merge=None):
+    '''
+    process text in chunks.\n
+    nlp_pipe: callable(texts) -> docs (e.g: partial(Nlpy.pipe, model='en', n_process=4)) \n
+    merge: callable(doc), merges doc tokens (e.g: entities.merge.merge_entities),
+    the merged tokens are returned in result.tokens \n
+    returns a json_model.Document (document offsets)
+    '''
+    offsets = deque()  # chunk offsets, in flight
+
+    def chunks():
+        for offset, chunk in split_chunks(text, max_chars):
+            offsets.append(offset)
+            yield chunk
+
+    result = Document()
+    if merge:
+        result.tokens = []
+    for doc in nlp_pipe(chunks()):
+        offset = offsets.popleft()
+        for ent in doc.ents:
+            result.entities.append(Entity(ent.text, ent.start_char + offset,
+                                          ent.end_char + offset, ent.label_))
+        for r in doc._.relations:
+            result.relations.append(Relation(_entity(r.s, offset), _span(r.p, offset),
+                                             _entity(r.o, offset), _entity(r.w, offset)))
+        if merge:
+            # after reading the relations (token offsets change)
+            result.tokens += [Span(t.text, t.idx + offset, t.idx + len(t) + offset)
+                              for t in merge(doc)]
+    return result
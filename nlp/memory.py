@@ -0,0 +1,32 @@
+'''
+process memory helpers
+'''
+
+import os
+import resource
+
+_PAGE_SIZE = resource.getpagesize()
+
+
+def rss_bytes():
+    '''
+    resident set size of the current process (bytes). \n
+    reads /proc/self/statm (linux), falls back to peak rss (ru_maxrss).
+    '''
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (IOError, OSError, IndexError, ValueError):
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on linux, bytes on macOS
+    return maxrss if os.uname().sysname == 'Darwin' else maxrss * 1024
+
+
+def format_bytes(n):
+    ''' e.g: 1536 -> '1.5 KB' '''
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if (abs(n) < 1024.0):
+            return '%.1f %s' % (n, unit)
+        n /= 1024.0
+    return '%.1f TB' % n
@@ -0,0 +1,162 @@
+'''
+a bounded model cache (LRU) for loaded nlp models.
+
+configuration (environment):
+    NLPY_CACHE_MAX_MODELS - max number of cached models (default: unbounded)
+    NLPY_CACHE_MAX_MEMORY - memory budget in MB (default: unbounded)
+    NLPY_CACHE_PINNED     - comma separated models that are never evicted (default: en,es)
+
+models in use (leased) are never evicted, eviction is deferred until released.
+'''
+
+import os
+import threading
+from collections import OrderedDict
+from logger import logger
+from .memory import format_bytes
+
+
+def _env_int(name, default=None):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+class _CacheEntry(object):
+    def __init__(self, nlp, size=0):
+        self.nlp = nlp
+        self.size = size  # approximate memory footprint (bytes)
+        self.refs = 0  # active leases
+        self.variants = {}  # features -> PipelineVariant
+
+
+class ModelCache(object):
+    '''
+    LRU model cache with a memory budget and/or max entries.
+    '''
+
+    def __init__(self, max_models=None, max_memory=None, pinned=None):
+        '''
+        max_models: max number of cached models (None: unbounded) \n
+        max_memory: memory budget in bytes (None: unbounded) \n
+        pinned: models that are never evicted
+        '''
+        self.max_models = max_models
+        self.max_memory = max_memory
+        self.pinned = set(pinned or [])
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # model -> _CacheEntry (LRU first)
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def from_env():
+        max_memory = _env_int('NLPY_CACHE_MAX_MEMORY')
+        pinned = os.environ.get('NLPY_CACHE_PINNED', 'en,es')
+        return ModelCache(
+            max_models=_env_int('NLPY_CACHE_MAX_MODELS'),
+            max_memory=max_memory * 1024 * 1024 if max_memory else None,
+            pinned=[m.strip() for m in pinned.split(',') if m.strip()])
+
+    def __contains__(self, model):
+        return model in self._entries
+
+    def __getitem__(self, model):
+        return self._entries[model].nlp
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    @property
+    def memory(self):
+        ''' approximate memory used by cached models (bytes) '''
+        return sum(e.size for e in self._entries.values())
+
+    def get(self, model, lease=False):
+        '''
+        return the cached model (or None), and mark it as most recently used. \n
+        lease: the model is in use until release(model) is called
+        '''
+        with self._lock:
+            entry = self._entries.get(model)
+            if (None == entry):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(model)
+            if lease:
+                entry.refs += 1
+            return entry.nlp
+
+    def put(self, model, nlp, size=0, lease=False):
+        ''' add a model to the cache (evicting least recently used models, not this one) '''
+        with self._lock:
+            entry = _CacheEntry(nlp, size)
+            if lease:
+                entry.refs += 1
+            self._entries[model] = entry
+            self._entries.move_to_end(model)
+            self._evict(skip=model)  # (over budget until the next put/release)
+
+    def variants(self, model):
+        ''' pipeline variants cached with the given model (dropped on eviction) '''
+        with self._lock:
+            entry = self._entries.get(model)
+            return entry.variants if entry else {}
+
+    def release(self, model):
+        ''' release a model leased by get/put '''
+        with self._lock:
+            entry = self._entries.get(model)
+            if (None == entry):
+                return
+            entry.refs = max(0, entry.refs - 1)
+            if (0 == entry.refs):
+                self._evict()  # deferred eviction
+
+    def pin(self, model):
+        with self._lock:
+            self.pinned.add(model)
+
+    def unpin(self, model):
+        with self._lock:
+            self.pinned.discard(model)
+            self._evict()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'models': list(self._entries),
+                'memory': self.memory,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _over_budget(self):
+        if (self.max_models and len(self._entries) > self.max_models):
+            return True
+        if (self.max_memory and self.memory > self.max_memory):
+            return True
+        return False
+
+    def _evict(self, skip=None):
+        '''
+        evict least recently used models (not pinned, not in use) \n
+        skip: a model not to evict (e.g: the model being added)
+        '''
+        if (not self._over_budget()):
+            return
+        for model in list(self._entries):
+            entry = self._entries[model]
+            if (model in self.pinned or entry.refs > 0 or model == skip):
+                continue
+            del self._entries[model]
+            self.evictions += 1
+            logger.info("Evicted model '%s' (%s)" %
+                        (model, format_bytes(entry.size)))
+            if (not self._over_budget()):
+                return
@@ -1,64 +1,217 @@
-import spacy
-import re
+import threading
+import timeit
+from contextlib import contextmanager
 from logger import logger
 
-from .entities import EntitiesPipeline
-from .relations import RelationPipeline
+from .model_cache import ModelCache
+from .variants import PipelineVariant
+from .memory import rss_bytes
+from .normalize import normalize
 
 
-def remove_whitespace_entities(doc):
+class _PendingLoad(object):
     '''
-    NER tags pure whitespace as entities \n
-    https://github.com/explosion/spaCy/issues/1717
+    a model load in progress. \n
+    threads asking for the same model wait here for the loading thread.
     '''
-    doc.ents = [e for e in doc.ents if not e.text.isspace()]
-    return doc
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.nlp = None
+        self.error = None
+
+    def set_result(self, nlp):
+        self.nlp = nlp
+        self.event.set()
+
+    def set_error(self, error):
+        self.error = error
+        self.event.set()
+
+    def wait(self):
+        self.event.wait()
+        if self.error:
+            raise Exception(self.error)
+        return self.nlp
 
 
 class Nlpy(object):
     '''
     model cache with nlpy pipelines for entities/relations
     '''
-    models = {}
+    models = ModelCache.from_env()
+    load_times = {}  # model -> load time (sec)
+
+    _lock = threading.Lock()
+    _loading = {}  # model -> _PendingLoad (in-flight loads)
 
     @staticmethod
-    def load(model):
+    def load(model, lease=False, features=None):
         '''
         load model using model cache.\n
-        add nlpy pipelines for entities/relations
+        add nlpy pipelines for entities/relations.\n
+        thread safe: concurrent callers for the same model wait on a single load.\n
+        lease: keep the model from being evicted until Nlpy.release(model) \n
+        features: return a (cached) pipeline variant running only the components
+        needed for these features (see nlp.variants.FEATURES)
         '''
-        if (not model in Nlpy.models):
-            try:
-                # load model
-                nlp = spacy.load(model)
-                logger.info("Loaded model '%s'" % model)
+        nlp = Nlpy._load(model, lease)
+        if features:
+            return Nlpy.variant(model, nlp, features)
+        return nlp
 
-                # add nlpy entities pipeline
-                nlp.add_pipe(EntitiesPipeline(nlp), after='ner')
-                nlp.add_pipe(remove_whitespace_entities, after='nlpy_entities')
+    @staticmethod
+    def variant(model, nlp, features):
+        ''' return the cached pipeline variant of a loaded model '''
+        key = frozenset(features)
+        variants = Nlpy.models.variants(model)
+        variant = variants.get(key)
+        if (None == variant):
+            variant = variants.setdefault(key, PipelineVariant(nlp, key))
+        return variant
 
-                # add nlpy relations pipeline
-                nlp.add_pipe(RelationPipeline(nlp), last=True)
+    @staticmethod
+    def _load(model, lease):
+        while True:
+            with Nlpy._lock:
+                nlp = Nlpy.models.get(model, lease=lease)
+                if (None != nlp):
+                    return nlp
+
+                pending = Nlpy._loading.get(model)
+                loader = (None == pending)
+                if loader:
+                    pending = _PendingLoad()
+                    Nlpy._loading[model] = pending
+
+            if loader:
+                break
 
-                # cache model
-                Nlpy.models[model] = nlp
+            # another thread is loading this model
+            nlp = pending.wait()
+            if (not lease):
                 return nlp
-            except Exception as ex:
-                error = "Failed to load model: '{}'".format(model)
-                logger.error(error)
-                logger.exception(ex)
-                raise Exception(error)
+            # lease the model through the cache (it might have been evicted meanwhile)
+
+        try:
+            rss = rss_bytes()
+            nlp = Nlpy._create(model)
+            size = max(0, rss_bytes() - rss)  # approximate model footprint
+        except Exception as ex:
+            error = "Failed to load model: '{}'".format(model)
+            logger.error(error)
+            logger.exception(ex)
+            with Nlpy._lock:
+                del Nlpy._loading[model]
+            pending.set_error(error)
+            raise Exception(error)
+
+        # cache model
+        with Nlpy._lock:
+            Nlpy.models.put(model, nlp, size, lease=lease)
+            del Nlpy._loading[model]
+        pending.set_result(nlp)
+        return nlp
+
+    @staticmethod
+    def release(model):
+        ''' release a model loaded with Nlpy.load(model, lease=True) '''
+        Nlpy.models.release(model)
+
+    @staticmethod
+    @contextmanager
+    def use(model, features=None):
+        '''
+        load a model and keep it cached while in use, e.g:
+            with Nlpy.use('en', features=['entities']) as nlp:
+                doc = nlp(text)
+        '''
+        nlp = Nlpy.load(model, lease=True, features=features)
+        try:
+            yield nlp
+        finally:
+            Nlpy.release(model)
+
+    @staticmethod
+    def pipe(texts, model, batch_size=1000, n_process=1, features=None):
+        '''
+        process a stream of texts in batches (yields docs, in order), e.g:
+            for doc in Nlpy.pipe(texts, 'en', batch_size=100, n_process=4):
+                ...
+        the model stays cached while streaming.
+        '''
+        nlp = Nlpy.load(model, lease=True, features=features)
+        try:
+            for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+                yield doc
+        finally:
+            Nlpy.release(model)
+
+    @staticmethod
+    def process_long(text, model, max_chars=None, batch_size=8, n_process=1, features=None,
+                     merge=None):
+        '''
+        long document mode: process text in chunks of up to max_chars
+        (split on paragraphs/sentences), n_process chunks in parallel.\n
+        merge: callable(doc), merged tokens are returned in result.tokens \n
+        returns a json_model.Document with document character offsets
+        '''
+        from . import longdoc
+
+        def nlp_pipe(chunks):
+            return Nlpy.pipe(chunks, model, batch_size=batch_size,
+                             n_process=n_process, features=features)
+        return longdoc.process_long(nlp_pipe, text, max_chars or longdoc.MAX_CHUNK_CHARS,
+                                    merge=merge)
+
+    @staticmethod
+    def _create(model):
+        '''
+        load model and add nlpy pipelines (called once per model).\n
+        restores a snapshot (see nlp.snapshot) when available
+        '''
+        # lazy imports: spacy (and the pipelines) load on first model load
+        import spacy
+        from . import snapshot
+
+        start = timeit.default_timer()
+
+        path = snapshot.find_snapshot(model)
+        if path:
+            nlp = snapshot.load_snapshot(path)
         else:
-            nlp = Nlpy.models[model]
-            return nlp
+            # load model
+            nlp = spacy.load(model)
+            Nlpy.assemble(nlp)
+
+        load_time = timeit.default_timer() - start
+        Nlpy.load_times[model] = load_time
+        logger.info("Loaded model '%s'%s (%.2f sec)" % (
+            model, " from snapshot '%s'" % path if path else '', load_time))
+        return nlp
+
+    @staticmethod
+    def assemble(nlp, entities=None):
+        '''
+        add nlpy pipelines for entities/relations to a loaded model.\n
+        entities: a pre-built EntitiesPipeline (default: build one)
+        '''
+        from .entities import EntitiesPipeline
+        from .relations import RelationPipeline
+
+        # add nlpy entities pipeline
+        # (also drops whitespace entities, see EntityCandidates)
+        nlp.add_pipe(entities or EntitiesPipeline(nlp), after='ner')
+
+        # add nlpy relations pipeline
+        nlp.add_pipe(RelationPipeline(nlp), last=True)
+        return nlp
 
-    # lilo: why do we need this?
     @staticmethod
     def pre_process_text(text):
-        # (keep paragraph separator) replace 2 or more newlines with tmp '\r\r'
-        text = re.sub(r'\n\n+', '\r\r', text)
-        # replace newlines with spaces
-        text = re.sub(r'\n', ' ', text)
-        # restore paragraph separator ('\r\r' -> '\n\n')
-        text = re.sub(r'\r\r', '\n\n', text)
-        return text
+        '''
+        keep paragraph separators (2 or more newlines -> '\\n\\n'),
+        replace other newlines with spaces.\n
+        see nlp.normalize for the offset map back to the original text
+        '''
+        return normalize(text)[0]
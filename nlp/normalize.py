@@ -0,0 +1,104 @@
+'''
+single-pass text normalization with an offset map back to the original text.
+
+normalization (see Nlpy.pre_process_text):
+    - 2 or more newlines -> paragraph separator ('\\n\\n')
+    - a single newline -> space
+
+e.g:
+    text, offsets = normalize(original)
+    doc = nlp(text)
+    start, end = offsets.span(ent.start_char, ent.end_char)  # original offsets
+
+streaming:
+    normalizer = Normalizer()
+    for chunk in chunks:
+        out.write(normalizer.feed(chunk))
+    out.write(normalizer.close())
+    offsets = normalizer.offsets
+'''
+
+import re
+from bisect import bisect_right
+
+_NEWLINES = re.compile(r'\n+')
+
+
+class OffsetMap(object):
+    '''
+    maps normalized text offsets to original text offsets.\n
+    stores one breakpoint per shrunk newline run (compact for typical text).
+    '''
+
+    def __init__(self):
+        self._starts = [0]  # normalized offsets where the shift changes
+        self._shifts = [0]  # original - normalized (from the matching start)
+
+    def add(self, start, shift):
+        ''' from normalized offset start on, original = normalized + shift '''
+        self._starts.append(start)
+        self._shifts.append(shift)
+
+    def to_original(self, offset):
+        i = bisect_right(self._starts, offset) - 1
+        return offset + self._shifts[i]
+
+    def span(self, start_char, end_char):
+        ''' original (start_char, end_char) of a normalized span '''
+        return self.to_original(start_char), self.to_original(end_char)
+
+    def __len__(self):
+        return len(self._starts)
+
+
+class Normalizer(object):
+    '''
+    streaming normalizer: feed chunks, get normalized chunks.\n
+    a newline run at the end of a chunk is held back until the run ends.
+    '''
+
+    def __init__(self):
+        self.offsets = OffsetMap()
+        self._pos = 0  # original offset of the next chunk
+        self._shift = 0  # original - normalized (so far)
+        self._run = 0  # pending newlines
+
+    def feed(self, chunk):
+        pieces = []
+        last = 0
+        for m in _NEWLINES.finditer(chunk):
+            start, end = m.span()
+            if (start > last):
+                pieces.append(self._flush(self._pos + last))
+                pieces.append(chunk[last:start])
+            self._run += end - start
+            last = end
+        if (last < len(chunk)):
+            pieces.append(self._flush(self._pos + last))
+            pieces.append(chunk[last:])
+        self._pos += len(chunk)
+        return ''.join(pieces)
+
+    def close(self):
+        ''' flush a pending newline run (end of text) '''
+        return self._flush(self._pos)
+
+    def _flush(self, end):
+        ''' normalize the pending newline run (end: its original end offset) '''
+        n = self._run
+        self._run = 0
+        if (0 == n):
+            return ''
+        if (1 == n):
+            return ' '
+        if (n > 2):
+            self._shift += n - 2
+            self.offsets.add(end - self._shift, self._shift)
+        return '\n\n'
+
+
+def normalize(text):
+    ''' returns (normalized text, OffsetMap) '''
+    normalizer = Normalizer()
+    normalized = normalizer.feed(text) + normalizer.close()
+    return normalized, normalizer.offsets
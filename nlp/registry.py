@@ -0,0 +1,88 @@
+'''
+per-instance registry of pipeline sub-components (entity/relation extractors).
+'''
+
+import threading
+from collections import OrderedDict
+
+
+class ComponentRegistry(object):
+    '''
+    ordered components (by component.name), each can be enabled/disabled at runtime.\n
+    iterating the registry yields the enabled components.
+    '''
+
+    def __init__(self, lang=None):
+        self.lang = lang
+        self.docs = 0  # docs processed
+        self.runs = 0  # component runs
+        self._components = OrderedDict()  # name -> component
+        self._disabled = set()
+        self._enabled = ()  # enabled components (snapshot, safe to iterate)
+        self._lock = threading.Lock()
+
+    def add(self, component):
+        with self._lock:
+            self._components[component.name] = component
+            self._update()
+
+    def remove(self, name):
+        with self._lock:
+            component = self._components.pop(name)
+            self._disabled.discard(name)
+            self._update()
+            return component
+
+    def get(self, name):
+        return self._components[name]
+
+    def enable(self, name):
+        with self._lock:
+            self.get(name)  # KeyError if unknown
+            self._disabled.discard(name)
+            self._update()
+
+    def disable(self, name):
+        with self._lock:
+            self.get(name)  # KeyError if unknown
+            self._disabled.add(name)
+            self._update()
+
+    @property
+    def names(self):
+        return list(self._components)
+
+    @property
+    def enabled_names(self):
+        return [c.name for c in self._enabled]
+
+    def __iter__(self):
+        return iter(self._enabled)
+
+    def __len__(self):
+        return len(self._enabled)
+
+    def __contains__(self, name):
+        return name in self._components
+
+    def record(self, docs, runs):
+        ''' count processed docs and component runs '''
+        self.docs += docs
+        self.runs += runs
+
+    @property
+    def components_per_doc(self):
+        return self.runs / self.docs if self.docs else 0.0
+
+    def stats(self):
+        return {
+            'lang': self.lang,
+            'components': self.names,
+            'enabled': self.enabled_names,
+            'docs': self.docs,
+            'components_per_doc': self.components_per_doc,
+        }
+
+    def _update(self):
+        self._enabled = tuple(c for name, c in self._components.items()
+                              if not name in self._disabled)
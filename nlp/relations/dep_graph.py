@@ -0,0 +1,185 @@
+'''
+compact dependency graph of a doc (built once per doc from the DocIndex heads):
+
+    children    - CSR arrays (indptr, children_), children in doc order
+    root        - sentence root per token
+    subtree     - in-order traversal (spacy's Token.subtree order): the subtree
+                  of a token is a contiguous slice of it, so subtree and
+                  ancestor queries are O(1)
+    edges       - subtree token bounds (left_edge, right_edge)
+    lca         - lowest common ancestor (binary lifting, O(log n))
+
+e.g:
+    graph = DocIndex(doc).graph
+    doc[graph.root_of(token.i)]
+    graph.is_ancestor(verb.i, token.i)
+    [doc[i] for i in graph.path(subj.i, obj.i)]
+'''
+
+import numpy as np
+
+
+class DepGraph(object):
+    '''
+    dependency graph of a doc (heads: absolute head index per token)
+    '''
+
+    def __init__(self, heads):
+        n = len(heads)
+        self.heads = heads
+        tokens = np.arange(n)
+        is_child = heads != tokens
+        parents = heads[is_child]
+        self.children_ = tokens[is_child][np.argsort(parents, kind='stable')]
+        self.indptr = np.zeros(n + 1, dtype='int64')
+        np.cumsum(np.bincount(parents, minlength=n), out=self.indptr[1:])
+        self.root = self._roots(heads)
+        self._traverse(n)
+        self._up = None  # binary lifting table (see lca)
+
+    @staticmethod
+    def _roots(heads):
+        ''' sentence root per token (pointer jumping) '''
+        root = heads.copy()
+        for _ in range(max(1, len(heads)).bit_length() + 1):
+            up = root[root]
+            if np.array_equal(up, root):
+                break
+            root = up
+        return root
+
+    def _traverse(self, n):
+        ''' depth, subtree sizes/bounds and in-order positions '''
+        heads = self.heads.tolist()
+        indptr = self.indptr.tolist()
+        children = self.children_.tolist()
+
+        # top-down (BFS) order from the sentence roots
+        order = [i for i in range(n) if heads[i] == i]
+        depth = [-1] * n
+        for i in order:
+            depth[i] = 0
+        k = 0
+        while (k < len(order)):
+            node = order[k]
+            for c in children[indptr[node]:indptr[node + 1]]:
+                depth[c] = depth[node] + 1
+                order.append(c)
+            k += 1
+
+        # bottom-up: subtree sizes and token bounds
+        size = [1] * n
+        lo = list(range(n))
+        hi = list(range(n))
+        for node in reversed(order):
+            h = heads[node]
+            if (h != node):
+                size[h] += size[node]
+                lo[h] = min(lo[h], lo[node])
+                hi[h] = max(hi[h], hi[node])
+
+        # top-down: in-order positions (lefts subtrees, token, rights subtrees)
+        start = [0] * n
+        pos = [0] * n
+        offset = 0
+        for node in order:
+            if (heads[node] == node):
+                start[node] = offset
+                offset += size[node]
+            cur = start[node]
+            kids = children[indptr[node]:indptr[node + 1]]
+            for c in kids:
+                if (c < node):
+                    start[c] = cur
+                    cur += size[c]
+            pos[node] = cur
+            cur += 1
+            for c in kids:
+                if (c > node):
+                    start[c] = cur
+                    cur += size[c]
+
+        inorder = [0] * offset
+        for node in order:
+            inorder[pos[node]] = node
+
+        self.depth = np.array(depth, dtype='int64')
+        self.start = np.array(start, dtype='int64')
+        self.end = self.start + np.array(size, dtype='int64')
+        self.pos = np.array(pos, dtype='int64')
+        self.inorder = np.array(inorder, dtype='int64')
+        self.left_edge = np.array(lo, dtype='int64')
+        self.right_edge = np.array(hi, dtype='int64')
+
+    def root_of(self, i):
+        return int(self.root[i])
+
+    def children(self, i):
+        ''' children of token i (doc order) '''
+        return self.children_[self.indptr[i]:self.indptr[i + 1]]
+
+    def lefts(self, i):
+        kids = self.children(i)
+        return kids[kids < i]
+
+    def rights(self, i):
+        kids = self.children(i)
+        return kids[kids > i]
+
+    def subtree(self, i):
+        ''' token i and its descendants (Token.subtree order) '''
+        return self.inorder[self.start[i]:self.end[i]]
+
+    def span_subtree(self, start, end):
+        ''' tokens of doc[start:end] and their descendants (Span.subtree order) '''
+        lefts = [c for t in range(end - 1, start - 1, -1)
+                 for c in self.lefts(t).tolist() if (c < start)]
+        rights = [c for t in range(start, end)
+                  for c in self.rights(t).tolist() if (c >= end)]
+        parts = [self.subtree(c) for c in lefts]
+        parts.append(np.arange(start, end))
+        parts += [self.subtree(c) for c in rights]
+        return np.concatenate(parts)
+
+    def is_ancestor(self, a, d):
+        ''' is token a an ancestor of token d (or d itself) '''
+        return self.start[a] <= self.pos[d] < self.end[a]
+
+    def lca(self, a, b):
+        ''' lowest common ancestor of tokens a and b (-1: different sentences) '''
+        if (self.root[a] != self.root[b]):
+            return -1
+        if self.is_ancestor(a, b):
+            return a
+        if self.is_ancestor(b, a):
+            return b
+        up = self._lifting()
+        # lift a to the highest ancestor that is not an ancestor of b
+        for k in range(len(up) - 1, -1, -1):
+            u = int(up[k][a])
+            if (not self.is_ancestor(u, b)):
+                a = u
+        return int(self.heads[a])
+
+    def path(self, a, b):
+        ''' tokens on the dependency path a -> lca -> b ([] if not connected) '''
+        c = self.lca(a, b)
+        if (c < 0):
+            return []
+        up, down = [], []
+        while (a != c):
+            up.append(a)
+            a = int(self.heads[a])
+        while (b != c):
+            down.append(b)
+            b = int(self.heads[b])
+        return up + [c] + down[::-1]
+
+    def _lifting(self):
+        ''' up[k][i]: 2^k-th ancestor of token i (roots are their own ancestors) '''
+        if (None == self._up):
+            up = [self.heads]
+            for _ in range(max(1, int(self.depth.max(initial=0))).bit_length()):
+                up.append(up[-1][up[-1]])
+            self._up = up
+        return self._up
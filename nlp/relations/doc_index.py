@@ -0,0 +1,98 @@
+'''
+columnar token features of a doc (DEP/POS/HEAD/ENT_TYPE ids), built once per doc
+by the RelationPipeline and shared by the relation extractors: candidate tokens
+are selected with integer comparisons (no per extractor scan of string attributes).
+
+e.g:
+    index = DocIndex(doc)
+    for subj in index.xsubj:  # nsubj, nsubjpass, csubj, ...
+        ...
+    for prep in index.tokens(dep='prep'):
+        if index.is_pos(prep.head.i, 'NOUN'):
+            ...
+'''
+
+import numpy as np
+from spacy.attrs import DEP, POS, HEAD, ENT_TYPE
+from .util import _XSUBJ
+from .dep_graph import DepGraph
+_xsubj_ids = {}  # dep id -> is xsubj (dep labels are shared by all docs)
+
+
+class DocIndex(object):
+    '''
+    per doc token features index
+    '''
+
+    def __init__(self, doc):
+        self.doc = doc
+        self._strings = doc.vocab.strings
+        a = doc.to_array([DEP, POS, HEAD, ENT_TYPE])
+        self.dep = a[:, 0]
+        self.pos = a[:, 1]
+        # HEAD is relative (uint64), make it absolute
+        self.head = np.arange(len(doc), dtype='int64') + a[:, 2].astype('int64')
+        self.ent_type = a[:, 3]
+        self._tokens = {}  # candidate sets cache
+        self._graph = None
+
+    @property
+    def graph(self):
+        ''' dependency graph (see DepGraph), built on first use '''
+        if (None == self._graph):
+            self._graph = DepGraph(self.head)
+        return self._graph
+
+    def id(self, label):
+        return self._strings[label]
+
+    def where(self, dep=None, pos=None):
+        ''' token indices with the given dep label(s) and pos tag(s) '''
+        mask = np.ones(len(self.doc), dtype=bool)
+        if (None != dep):
+            mask &= self._isin(self.dep, dep)
+        if (None != pos):
+            mask &= self._isin(self.pos, pos)
+        return np.flatnonzero(mask)
+
+    def tokens(self, dep=None, pos=None):
+        ''' tokens with the given dep label(s) and pos tag(s) (doc order, cached) '''
+        key = (dep, pos)
+        if (not key in self._tokens):
+            self._tokens[key] = [self.doc[i] for i in self.where(dep, pos).tolist()]
+        return self._tokens[key]
+
+    @property
+    def xsubj(self):
+        ''' subject tokens (see util.is_xsubj) '''
+        if (not 'xsubj' in self._tokens):
+            deps = [d for d in np.unique(self.dep).tolist() if self._is_xsubj(d)]
+            self._tokens['xsubj'] = [self.doc[i] for i in
+                                     np.flatnonzero(np.isin(self.dep, deps)).tolist()]
+        return self._tokens['xsubj']
+
+    def is_pos(self, i, pos):
+        return self.pos[i] == self.id(pos)
+
+    def is_dep(self, i, dep):
+        return self.dep[i] == self.id(dep)
+
+    def is_xsubj(self, i):
+        return self._is_xsubj(int(self.dep[i]))
+
+    def has_ent_type(self, tokens, labels):
+        ''' mask: tokens (indices) with one of the given entity labels '''
+        return self._isin(self.ent_type[tokens], labels)
+
+    def is_entity(self, i):
+        return 0 != self.ent_type[i]
+
+    def _isin(self, values, labels):
+        if isinstance(labels, str):
+            return values == self.id(labels)
+        return np.isin(values, [self.id(label) for label in labels])
+
+    def _is_xsubj(self, dep):
+        if (not dep in _xsubj_ids):
+            _xsubj_ids[dep] = None != _XSUBJ.match(self._strings[dep]) if dep else False
+        return _xsubj_ids[dep]
@@ -1,7 +1,11 @@
+import weakref
+from collections import OrderedDict
 import spacy
 from spacy.tokens import Doc
 from .util import root
-from .relation import Relation, Relations
+from .doc_index import DocIndex
+from .relation import Relation, Relations, relations_to_data, relations_from_data
+from ..registry import ComponentRegistry
 from .x_en_svo import EN_SVO_RelationExtractor
 from .x_en_prep_rel import EN_PREP_RelationExtractor
 from .x_en_relcl_v_o import EN_RELCL_V_O_RelationExtractor
@@ -11,6 +15,43 @@ from .x_en_person_org import EN_REL_PERSON_ORG
 from .x_es_svo import ES_SVO_RelationExtractor
 from .x_es_nsubj_noun_nmod import ES_NSUBJ_NOUN_NMOD_RelationExtractor
 
+# doc._.relations are kept serializable in doc.user_data (doc.to_bytes, nlp.pipe(n_process=...)),
+# the Relations objects are cached per doc
+_RELATIONS_KEY = 'nlpy_relations'
+_relations_cache = weakref.WeakKeyDictionary()  # doc -> Relations
+_nlp_by_vocab = weakref.WeakValueDictionary()  # id(vocab) -> nlp
+
+
+def get_relations(doc):
+    relations = _relations_cache.get(doc)
+    if (None == relations):
+        nlp = _nlp_by_vocab.get(id(doc.vocab))
+        data = doc.user_data.get(_RELATIONS_KEY, [])
+        relations = relations_from_data(doc, nlp, data)
+        _relations_cache[doc] = relations
+    return relations
+
+
+def set_relations(doc, relations):
+    doc.user_data[_RELATIONS_KEY] = relations_to_data(relations)
+    _relations_cache[doc] = relations
+
+
+# relation extractors per language
+EXTRACTORS = {
+    'en': (
+        EN_SVO_RelationExtractor,
+        EN_PREP_RelationExtractor,
+        EN_RELCL_V_O_RelationExtractor,
+        EN_REL_PERSON_ORG,
+    ),
+    'es': (
+        ES_SVO_RelationExtractor,
+        ES_NSUBJ_NOUN_NMOD_RelationExtractor,
+        ES_APPOS_RelationExtractor,
+    ),
+}
+
 
 class RelationPipeline(object):
     '''
@@ -22,47 +63,92 @@ class RelationPipeline(object):
 
     you can add your relation extrators (one or more) using:
         pipeline.add_pipe(YOUR_RelationExtractor())
+    (extractors with uses_index = True are called with index=DocIndex(doc))
+
+    extractors can be disabled/enabled at runtime using:
+        pipeline.disable_pipe('en-svo')
+
+    a relation found by several extractors is kept once (see dedup_relations)
 
     '''
 
     name = 'nlpy_relations'
-    pipe_ = []
 
     def __init__(self, nlp):
         self.nlp = nlp
-        Doc.set_extension('relations', default=[])
-
-        if (nlp.lang == 'en'):
-            self.add_pipe(EN_SVO_RelationExtractor())
-            self.add_pipe(EN_PREP_RelationExtractor())
-            self.add_pipe(EN_RELCL_V_O_RelationExtractor())
-            self.add_pipe(EN_REL_PERSON_ORG())
-        elif (nlp.lang == 'es'):
-            self.add_pipe(ES_SVO_RelationExtractor())
-            self.add_pipe(ES_NSUBJ_NOUN_NMOD_RelationExtractor())
-            self.add_pipe(ES_APPOS_RelationExtractor())
-        else:
+        _nlp_by_vocab[id(nlp.vocab)] = nlp
+        if (not Doc.has_extension('relations')):
+            Doc.set_extension('relations', getter=get_relations,
+                              setter=set_relations)
+
+        if (not nlp.lang in EXTRACTORS):
             raise TypeError('language not supported!')
 
+        # extractors of this pipeline (for nlp.lang only)
+        self.pipe_ = ComponentRegistry(nlp.lang)
+        for extractor in EXTRACTORS[nlp.lang]:
+            self.add_pipe(extractor())
+
     def __call__(self, doc):
         all_relations = Relations(self.nlp)
-        for c in self.pipe_:
+        components = list(self.pipe_)
+        index = DocIndex(doc)  # shared by the extractors (one pass over the doc)
+        for c in components:
             c_relations = Relations(self.nlp)
-            doc = c(doc, c_relations)
+            if getattr(c, 'uses_index', False):
+                doc = c(doc, c_relations, index=index)
+            else:
+                doc = c(doc, c_relations)
             for r in c_relations:  # update originating extractor
                 r.x = c.name
             all_relations += c_relations
-        doc._.relations = self.filter_relations(all_relations)
+        self.pipe_.record(1, len(components))
+        all_relations = self.dedup_relations(all_relations)
+        doc._.relations = self.filter_relations(all_relations, index)
         return doc
 
+    def pipe(self, docs, batch_size=1000):
+        '''
+        for nlp.pipe: the extractors work on a single doc parse, so the docs
+        are processed one at a time (batch_size is not used)
+        '''
+        for doc in docs:
+            yield self(doc)
+
     def add_pipe(self, component):
-        self.pipe_.append(component)
+        self.pipe_.add(component)
 
-    def filter_relations(self, relations):
+    def get_pipe(self, name):
+        return self.pipe_.get(name)
+
+    def enable_pipe(self, name):
+        self.pipe_.enable(name)
+
+    def disable_pipe(self, name):
+        self.pipe_.disable(name)
+
+    def dedup_relations(self, relations):
+        '''
+        unique relations by (s, p, o, w) token bounds (first found order),
+        x of a relation found by several extractors: all of them, e.g: 'en-svo,prep-rel'
+        '''
+        unique = OrderedDict()  # key -> relation
+        for r in relations:
+            key = r.key()
+            first = unique.get(key)
+            if (None == first):
+                unique[key] = r
+            elif (not r.x in first.extractors):
+                first.x = ','.join(first.extractors + r.extractors)
+        deduped = Relations(self.nlp)
+        deduped += list(unique.values())
+        return deduped
+
+    def filter_relations(self, relations, index=None):
         filtered = Relations(self.nlp)
         for r in relations:
             # filter out negative relations
-            if self.is_neg(r):
+            if self.is_neg(r, index):
                 continue
 
             # add relation
@@ -70,12 +156,15 @@ class RelationPipeline(object):
 
         return filtered
 
-    def is_neg(self, r):
+    def is_neg(self, r, index=None):
         if (not r.p):
             return False
 
-        rt = root(r.p)
+        rt = root(r.p, index.graph if index else None)
         if (rt.lang_ == 'en'):
+            if (None != index):
+                children = index.graph.children(rt.i)
+                return bool((index.dep[children] == index.id('neg')).any())
             for w in rt.children:
                 if (w.dep_ == 'neg'):
                     return True
@@ -1,9 +1,16 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
 import spacy
 from spacy.tokens import Token, Span, Doc
 
 _USE_SIMILARITY_MATCH = True
 TRESHOLD = 0.6
 
+# max strings kept processed by to_span, per model (NLPY_SPAN_CACHE_SIZE, 0: no cache)
+SPAN_CACHE_SIZE = int(os.environ.get('NLPY_SPAN_CACHE_SIZE', 10000))
+
 
 def str_match(nlp, s1, s2):
     if (_USE_SIMILARITY_MATCH):
@@ -23,8 +30,9 @@ def txt(x):
 
 def str_match_similarity(nlp, s1, s2):
     if (s1 and s2):
-        span1 = to_span(nlp, s1)
-        span2 = to_span(nlp, s2)
+        vectors_only = has_vectors(nlp)
+        span1 = to_span(nlp, s1, vectors_only)
+        span2 = to_span(nlp, s2, vectors_only)
         sim = span1.similarity(span2)
         if (sim >= TRESHOLD):
             return True
@@ -33,18 +41,122 @@ def str_match_similarity(nlp, s1, s2):
     return False
 
 
-def to_span(nlp, x):
+def has_vectors(nlp):
+    ''' does the model have word vectors (similarity without running the pipeline) '''
+    return 0 != nlp.vocab.vectors.size
+
+
+def to_span(nlp, x, vectors_only=False):
+    '''
+    span of a token/span/string, strings are processed once (see SpanCache) \n
+    vectors_only: strings are tokenized only (for similarity using the vocab vectors)
+    '''
     if isinstance(x, Span):
         return x
     if isinstance(x, Token):
         return x.doc[x.i:x.i+1]
     if isinstance(x, str):
+        cache = span_cache(nlp)
+        key = (vectors_only, x)
+        span = cache.get(key)
+        if (None == span):
+            span = _process(nlp, x, vectors_only)
+            cache.put(key, span)
+        return span
+    return None
+
+
+def _process(nlp, x, vectors_only):
+    if (vectors_only):
+        doc = nlp.make_doc(x)
+    else:
         with nlp.disable_pipes('nlpy_relations'):
             doc = nlp(x)
-        return doc[doc[0].i:doc[-1].i+1]
+    return doc[doc[0].i:doc[-1].i+1]
+
+
+class SpanCache(object):
+    '''
+    bounded LRU cache of processed strings of a model: (vectors_only, string) -> span
+    '''
+
+    def __init__(self, max_size=SPAN_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> span (LRU first)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            span = self._entries.get(key)
+            if (None == span):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return span
+
+    def put(self, key, span):
+        if (self.max_size <= 0):
+            return
+        with self._lock:
+            self._entries[key] = span
+            self._entries.move_to_end(key)
+            while (len(self._entries) > self.max_size):
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# model -> SpanCache (the spans keep their doc vocab: dropped with the model,
+# e.g: when evicted from the model cache)
+_span_caches = weakref.WeakKeyDictionary()
+_span_caches_lock = threading.Lock()
+
+
+def span_cache(nlp):
+    ''' the SpanCache of a model '''
+    with _span_caches_lock:
+        cache = _span_caches.get(nlp)
+        if (None == cache):
+            cache = _span_caches[nlp] = SpanCache()
+        return cache
+
+
+def _bounds(x):
+    ''' token bounds (start, end) of a span/token '''
+    if isinstance(x, Span):
+        return (x.start, x.end)
+    if isinstance(x, Token):
+        return (x.i, x.i + 1)
     return None
 
 
+def _key(x):
+    return _bounds(x) or txt(x)
+
+
+def relations_to_data(relations):
+    ''' serializable relations: [(s, p, o, w, x)] with token bounds '''
+    return [(_bounds(r.s), _bounds(r.p), _bounds(r.o), _bounds(r.w), r.x)
+            for r in relations]
+
+
+def relations_from_data(doc, nlp, data):
+    ''' restore relations serialized by relations_to_data '''
+    relations = Relations(nlp)
+    for s, p, o, w, x in data:
+        s, p, o, w = [doc[b[0]:b[1]] if b else None for b in (s, p, o, w)]
+        relations.append(Relation(s, p, o, w, x))
+    return relations
+
+
 class Relations(object):
 
     ''' a for enumerating relation collection '''
@@ -52,6 +164,7 @@ class Relations(object):
     def __init__(self, nlp):
         self._relations = []
         self.nlp = nlp
+        self._index = None  # matching index (see contains)
 
     def __iter__(self):
         return iter(self._relations)
@@ -63,6 +176,7 @@ class Relations(object):
         return self._relations[index]
 
     def __iadd__(self, other):
+        self._index = None
         if (isinstance(other, Relations)):
             self._relations += other._relations
             return self
@@ -79,6 +193,7 @@ class Relations(object):
         raise TypeError(msg)
 
     def append(self, r):
+        self._index = None
         if (isinstance(r, Relation)):
             self._relations.append(r)
             return
@@ -91,21 +206,22 @@ class Relations(object):
         raise TypeError(msg)
 
     def remove(self, r):
+        self._index = None
         self._relations.remove(r)
 
+    def index(self):
+        ''' matching index of these relations (kept until they are changed) '''
+        if (None == self._index):
+            from .relation_index import RelationIndex
+            self._index = RelationIndex(self.nlp, self._relations)
+        return self._index
+
     def contains(self, r):
-        for _r in self:
-            if not str_match(self.nlp, _r.s, r.s):
-                continue
-            if not str_match(self.nlp, _r.p, r.p):
-                continue
-            if not str_match(self.nlp, _r.o, r.o):
-                continue
-            if not str_match(self.nlp, _r.w, r.w):
-                continue
-            return True
+        return self.index().contains(r)
 
-        return False
+    def contains_all(self, relations):
+        ''' contains() of each of the relations (one matching pass) '''
+        return self.index().contains_all(relations)
 
 
 class Relation(object):
@@ -117,7 +233,7 @@ class Relation(object):
         p: predicate \n
         o: object \n
         w: when \n
-        x: originating extractor
+        x: originating extractor(s), comma separated
         '''
 
         self.s = s
@@ -126,6 +242,15 @@ class Relation(object):
         self.w = w
         self.x = x
 
+    @property
+    def extractors(self):
+        ''' names of the originating extractors '''
+        return self.x.split(',') if self.x else []
+
+    def key(self):
+        ''' (s, p, o, w) token bounds: relations with equal keys are the same relation '''
+        return (_key(self.s), _key(self.p), _key(self.o), _key(self.w))
+
     def __str__(self):
         return str((self.s, self.o, self.p, self.w))
 
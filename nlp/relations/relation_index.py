@@ -0,0 +1,138 @@
+'''
+relation matching index (see Relations.contains).
+
+relation fields (s, p, o, w) are encoded once per relation: text and token
+orths ids (exact matches short-circuit the vector similarity) and normalized
+span vectors (strings are cached by relation.to_span), candidate similarities
+are computed as one matrix product per field against relation.TRESHOLD.
+'''
+
+import numpy as np
+from . import relation as _relation
+
+FIELDS = ('s', 'p', 'o', 'w')
+
+
+class _Field(object):
+    ''' one relation field (s/p/o/w) of a list of relations, as arrays '''
+
+    def __init__(self, present, texts, orths, vectors):
+        self.present = present  # field has a value
+        self.texts = texts  # text ids
+        self.orths = orths  # token orths ids
+        self.vectors = vectors  # unit span vectors (rows)
+
+
+class RelationIndex(object):
+    '''
+    index of relations for matching (same as relation.str_match on all fields):\n
+    index.contains(r) / index.find(r) for a single relation,
+    index.match(relations) for a whole relation list (one matrix per field)
+    '''
+
+    def __init__(self, nlp, relations):
+        self.nlp = nlp
+        self.relations = list(relations)
+        self.similarity = _relation._USE_SIMILARITY_MATCH
+        self._ids = {}  # text / orths -> id (shared by indexed and matched relations)
+        self._vectors_only = _relation.has_vectors(nlp)  # no pipeline for strings
+        self._hooks = False  # custom span similarity (no vectorized matching)
+        self._width = None  # vectors width
+        self._fields = self._encode(self.relations)
+
+    def __len__(self):
+        return len(self.relations)
+
+    def contains(self, r):
+        return bool(self.match([r]).any())
+
+    def find(self, r):
+        ''' position of the first relation matching r (-1 if none) '''
+        matches = np.flatnonzero(self.match([r])[0])
+        return int(matches[0]) if len(matches) else -1
+
+    def contains_all(self, relations):
+        ''' for each of the relations: is it in the index '''
+        return self.match(relations).any(axis=1).tolist()
+
+    def match(self, relations):
+        ''' bool matrix (len(relations), len(index)): relations[i] matches relations j '''
+        relations = list(relations)
+        m = np.ones((len(relations), len(self.relations)), dtype=bool)
+        if (0 == m.size):
+            return m
+
+        fields = self._encode(relations)
+        if (self._hooks):
+            return self._match_pairs(relations, m)
+
+        for q, f in zip(fields, self._fields):
+            m &= self._match_field(q, f, m)
+            if (not m.any()):
+                break
+        return m
+
+    def _match_field(self, q, f, candidates):
+        both = np.outer(q.present, f.present)
+        none = np.outer(~q.present, ~f.present)
+        same = q.texts[:, None] == f.texts[None, :]
+        if (self.similarity):
+            same |= q.orths[:, None] == f.orths[None, :]  # similarity 1.0
+
+            # vector similarity of the remaining candidate pairs only
+            todo = candidates & both & ~same
+            rows, cols = np.flatnonzero(todo.any(axis=1)), np.flatnonzero(todo.any(axis=0))
+            if (len(rows) and q.vectors.shape[1] == f.vectors.shape[1]):
+                sim = np.dot(q.vectors[rows], f.vectors[cols].T)
+                same[np.ix_(rows, cols)] |= sim >= _relation.TRESHOLD
+        return none | (both & same)
+
+    def _match_pairs(self, relations, m):
+        ''' one str_match per field and pair (spans with a similarity hook) '''
+        for i, r in enumerate(relations):
+            for j, _r in enumerate(self.relations):
+                m[i, j] = all(_relation.str_match(self.nlp, getattr(_r, f), getattr(r, f))
+                              for f in FIELDS)
+        return m
+
+    def _encode(self, relations):
+        return [self._encode_field([getattr(r, f) for r in relations]) for f in FIELDS]
+
+    def _encode_field(self, values):
+        n = len(values)
+        present = np.zeros(n, dtype=bool)
+        texts = np.full(n, -1, dtype='int64')
+        orths = np.full(n, -1, dtype='int64')
+        vectors = []
+        for i, x in enumerate(values):
+            vectors.append(None)
+            if (not x):
+                continue
+            present[i] = True
+            texts[i] = self._id(_relation.txt(x))
+            if (not self.similarity):
+                continue
+            span = self._span(x)
+            if ('similarity' in span.doc.user_span_hooks):
+                self._hooks = True
+            orths[i] = self._id(tuple(t.orth for t in span))
+            if (span.vector_norm):
+                vectors[i] = span.vector / span.vector_norm
+        return _Field(present, texts, orths, self._matrix(vectors))
+
+    def _id(self, key):
+        return self._ids.setdefault(key, len(self._ids))
+
+    def _span(self, x):
+        return _relation.to_span(self.nlp, x, self._vectors_only)
+
+    def _matrix(self, vectors):
+        ''' unit vectors as rows (zero rows: no vector) '''
+        if (None == self._width):
+            self._width = max([len(v) for v in vectors if None is not v] or [None])
+        width = self._width or 0
+        matrix = np.zeros((len(vectors), width), dtype='float32')
+        for i, v in enumerate(vectors):
+            if (None is not v and len(v) == width):
+                matrix[i] = v
+        return matrix
@@ -5,23 +5,31 @@ various utilities to help with relation extraction
 
 import logging
 import re
+import numpy as np
 import spacy
 
 
+_XSUBJ = re.compile(r'[a-z]subj')
+
+
 def is_xsubj(w):
-    return None != re.match(r'[a-z]subj', w.dep_)
+    return None != _XSUBJ.match(w.dep_)
 
 
 def is_root(w):
     return w.dep_ == 'ROOT'
 
 
-def root(w):
+def root(w, graph=None):
+    ''' sentence root of a token/span (graph: the doc DepGraph, O(1)) '''
     if (type(w) == spacy.tokens.Span):
         head = w[0].head
     else:
         head = w.head
 
+    if (None != graph):
+        return head.doc[graph.root_of(head.i)]
+
     while not is_root(head):
         head = head.head
     return head
@@ -58,7 +66,7 @@ def _extend_compound(w):
     start = w.start if hasattr(w, 'start') else w.i
     end = w.end if hasattr(w, 'end') else w.i + 1
 
-    lang = root(w).lang_
+    lang = w.doc.lang_
 
     w_0 = w[0] if hasattr(w, 'start') else w
 
@@ -76,14 +84,20 @@ def _extend_compound(w):
     return w.doc[start:end]
 
 
-def extract_when(pred_span):
-    when = next(filter(
-        lambda w: w.ent_type_ in ('DATE', 'TIME'), pred_span.subtree), None)
-
-    if (None == when):
-        pred_head = pred_span[0].head
+def extract_when(pred_span, index=None):
+    ''' DATE/TIME of a predicate (index: the doc DocIndex, no subtree walk) '''
+    if (None != index):
+        when = _first_when(index, index.graph.span_subtree(pred_span.start, pred_span.end))
+        if (None == when):
+            when = _first_when(index, index.graph.children(pred_span[0].head.i))
+    else:
         when = next(filter(
-            lambda w: w.ent_type_ in ('DATE', 'TIME'), pred_head.children), None)
+            lambda w: w.ent_type_ in ('DATE', 'TIME'), pred_span.subtree), None)
+
+        if (None == when):
+            pred_head = pred_span[0].head
+            when = next(filter(
+                lambda w: w.ent_type_ in ('DATE', 'TIME'), pred_head.children), None)
 
     if (None == when):
         return None
@@ -96,7 +110,15 @@ def extract_when(pred_span):
     return when_span
 
 
-def create_relation(s, p, o):
+def _first_when(index, tokens):
+    ''' first DATE/TIME token of tokens (indices) '''
+    found = np.flatnonzero(index.has_ent_type(tokens, ('DATE', 'TIME')))
+    if (0 == len(found)):
+        return None
+    return index.doc[int(tokens[found[0]])]
+
+
+def create_relation(s, p, o, index=None):
     s = _extend_compound(s)
     o = _extend_compound(o)
 
@@ -108,7 +130,7 @@ def create_relation(s, p, o):
         return (s, p, None, when)
 
     if (None != p):
-        w = extract_when(p)
+        w = extract_when(p, index)
         logging.debug('(x:util) when: {}'.format(w))
         return (s, p, o, w)
 
@@ -1,6 +1,7 @@
 import logging
 import spacy
-from .util import is_xsubj, filter_subj, filter_obj, _extend_lefts, _right_conj, create_relation
+from .doc_index import DocIndex
+from .util import create_relation
 
 
 class EN_REL_PERSON_ORG(object):
@@ -9,22 +10,27 @@ class EN_REL_PERSON_ORG(object):
     '''
 
     name = 'en-person-org'
+    uses_index = True  # __call__(doc, relations, index=DocIndex)
 
     def __init__(self):
         pass
 
-    def __call__(self, doc, relations):
+    def __call__(self, doc, relations, index=None):
+        if (None == index):
+            index = DocIndex(doc)
+        if (not index.id('PERSON') in index.ent_type):
+            return doc  # no PERSON entities
         for person in filter(lambda e: e.label_ == 'PERSON', doc.ents):
             for t in self.person_prep_org(doc, person):
-                relations.append(create_relation(*t))
+                relations.append(create_relation(*t, index=index))
             for t in self.person_lefts_org(doc, person):
-                relations.append(create_relation(*t))
+                relations.append(create_relation(*t, index=index))
             # TODO
             for t in self.person_rights_org(doc, person):
-                relations.append(create_relation(*t))
+                relations.append(create_relation(*t, index=index))
             # TODO
             for t in self.person_verb_org(doc, person):
-                relations.append(create_relation(*t))
+                relations.append(create_relation(*t, index=index))
         return doc
 
     def person_prep_org(self, doc, person):
@@ -1,6 +1,7 @@
 import logging
 import spacy
-from .util import is_xsubj, filter_subj, filter_obj, _right_conj, create_relation, root
+from .doc_index import DocIndex
+from .util import filter_subj, _right_conj, create_relation, root
 
 
 class EN_PREP_RelationExtractor(object):
@@ -10,6 +11,7 @@ class EN_PREP_RelationExtractor(object):
     '''
 
     name = 'prep-rel'
+    uses_index = True  # __call__(doc, relations, index=DocIndex)
 
     def __init__(self):
         pass
@@ -18,34 +20,37 @@ class EN_PREP_RelationExtractor(object):
                  doc,
                  relations,
                  exclude_negation=True,
-                 entities_only=True):
+                 entities_only=True,
+                 index=None):
         '''
         extracts (subject, pred, object, when, self.name) \n
         e.g: '<Hillary/subj> is the <mother/pred> <of/prep> <Chelsea/obj>' \n
         e.g: '<Mark Zukerberg/subj> is the <co-founder/pred> and <CEO/pred> <of/prep> <Facebook/obj>'
         '''
-        for t in self.extract_preposition_relations(doc):
-            relations.append(create_relation(*t))
+        if (None == index):
+            index = DocIndex(doc)
+        for t in self.extract_preposition_relations(doc, index):
+            relations.append(create_relation(*t, index=index))
         return doc
 
-    def extract_preposition_relations(self, doc):
+    def extract_preposition_relations(self, doc, index):
         ''' extract (subject, pred, object) triples '''
         # start extraction from prep
-        for prep in filter(lambda t: t.dep_ == 'prep', doc):
+        for prep in index.tokens(dep='prep'):
 
             # pred: <NOUN/pred> <-- <of/prep>
             pred = prep.head
-            if (pred.pos_ != 'NOUN'):
+            if (not index.is_pos(pred.i, 'NOUN')):
                 continue  # skip if not NOUN
             logging.debug('(x:{}) pred: {}'.format(self.name, pred))
 
             # subj (try searching subj in pred.head)
             subj = pred.head
-            if (not is_xsubj(subj)):
+            if (not index.is_xsubj(subj.i)):
                 # try searching subj in pred.lefts
                 subj = next(pred.lefts, None)
                 if (None == subj):
-                    subj = root(pred)  # try searching subj in pred.root
+                    subj = root(pred, index.graph)  # try searching subj in pred.root
 
             if (None == subj):
                 continue
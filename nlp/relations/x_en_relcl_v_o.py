@@ -1,5 +1,6 @@
 import spacy
-from .util import is_xsubj, filter_subj, filter_obj, _extend_lefts, _right_conj, create_relation
+from .doc_index import DocIndex
+from .util import filter_subj, filter_obj, _right_conj, create_relation
 
 
 class EN_RELCL_V_O_RelationExtractor(object):
@@ -9,22 +10,22 @@ class EN_RELCL_V_O_RelationExtractor(object):
     '''
 
     name = 'en-relcl-v-o'
+    uses_index = True  # __call__(doc, relations, index=DocIndex)
 
     def __init__(self):
         pass
 
-    def __call__(self, doc, relations):
+    def __call__(self, doc, relations, index=None):
         ''' extracts (relcl, verb, object, when, self.name) '''
-        for t in self.relcl_verb_object(doc):
-            relations.append(create_relation(*t))
+        if (None == index):
+            index = DocIndex(doc)
+        for t in self.relcl_verb_object(doc, index):
+            relations.append(create_relation(*t, index=index))
         return doc
 
-    def relcl_verb_object(self, doc):
+    def relcl_verb_object(self, doc, index):
         ''' extract (subj, verb/dep_ == relcl, object) triples '''
-        for verb in filter(lambda t: t.pos_ == 'VERB', doc):
-            if (verb.dep_ != 'relcl'):
-                continue
-
+        for verb in index.tokens(dep='relcl', pos='VERB'):
             subj = verb.head
             if (not filter_subj(subj)):
                 continue  # skip none-entity
@@ -1,6 +1,7 @@
 import logging
 import spacy
-from .util import is_xsubj, filter_subj, filter_obj, _extend_lefts, _right_conj, create_relation
+from .doc_index import DocIndex
+from .util import filter_subj, filter_obj, _extend_lefts, _right_conj, create_relation
 
 
 class EN_SVO_RelationExtractor(object):
@@ -9,19 +10,22 @@ class EN_SVO_RelationExtractor(object):
     '''
 
     name = 'en-svo'
+    uses_index = True  # __call__(doc, relations, index=DocIndex)
 
     def __init__(self):
         pass
 
-    def __call__(self, doc, relations):
+    def __call__(self, doc, relations, index=None):
         ''' extracts (subject, pred, object, when, self.name) '''
-        for t in self.subject_verb_object(doc):
-            relations.append(create_relation(*t))
+        if (None == index):
+            index = DocIndex(doc)
+        for t in self.subject_verb_object(doc, index):
+            relations.append(create_relation(*t, index=index))
         return doc
 
-    def subject_verb_object(self, doc):
+    def subject_verb_object(self, doc, index):
         ''' extract (subject, verb, object) triples '''
-        for subj in filter(lambda t: is_xsubj(t), doc):
+        for subj in index.xsubj:
             if (not filter_subj(subj)):
                 continue  # skip none-entity
             logging.debug('(x:{}) subj: {}'.format(self.name, subj))
@@ -1,6 +1,7 @@
 import logging
 import spacy
-from .util import is_xsubj, filter_subj, filter_obj, _extend_lefts, _right_conj, create_relation
+from .doc_index import DocIndex
+from .util import filter_subj, _right_conj, create_relation
 
 
 class ES_APPOS_RelationExtractor(object):
@@ -10,19 +11,22 @@ class ES_APPOS_RelationExtractor(object):
     '''
 
     name = 'es-appos'
+    uses_index = True  # __call__(doc, relations, index=DocIndex)
 
     def __init__(self):
         pass
 
-    def __call__(self, doc, relations):
+    def __call__(self, doc, relations, index=None):
         ''' extracts (subject, pred, object, when, self.name) '''
-        for t in self.nsubj_appos_nmod(doc):
-            relations.append(create_relation(*t))
+        if (None == index):
+            index = DocIndex(doc)
+        for t in self.nsubj_appos_nmod(doc, index):
+            relations.append(create_relation(*t, index=index))
         return doc
 
-    def nsubj_appos_nmod(self, doc):
+    def nsubj_appos_nmod(self, doc, index):
         ''' extract (subject, verb, object) triples '''
-        for nsubj in filter(lambda t: is_xsubj(t), doc):
+        for nsubj in index.xsubj:
             # nsubj
             if (not filter_subj(nsubj)):
                 continue  # skip none-entity
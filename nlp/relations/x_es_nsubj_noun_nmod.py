@@ -1,6 +1,7 @@
 import logging
 import spacy
-from .util import is_xsubj, filter_subj, filter_obj, _right_conj, create_relation, root
+from .doc_index import DocIndex
+from .util import filter_subj, filter_obj, _right_conj, create_relation
 
 
 class ES_NSUBJ_NOUN_NMOD_RelationExtractor(object):
@@ -10,33 +11,36 @@ class ES_NSUBJ_NOUN_NMOD_RelationExtractor(object):
     '''
 
     name = 'es-nsubj-noun-nmod'
+    uses_index = True  # __call__(doc, relations, index=DocIndex)
 
     def __init__(self):
         pass
 
-    def __call__(self, doc, relations):
+    def __call__(self, doc, relations, index=None):
         '''
         extracts (subject, pred, object, when, self.name) \n
         e.g: '<Bill Clinton/subj> es el <presidente/NOUN> de los <U.S.A/nmod>' \n
         e.g: '<Hillary/nsubj> es la <madre/NOUN> del <Chelsea/nmod>' \n
         e.g: '<Mark Zuckerberg/nsubj> es el <cofundador/NOUN> y <CEO/conj> de <Facebook/nmod>'
         '''
-        for t in self.extract_nsubj_noun_nmod_relations(doc):
-            relations.append(create_relation(*t))
+        if (None == index):
+            index = DocIndex(doc)
+        for t in self.extract_nsubj_noun_nmod_relations(doc, index):
+            relations.append(create_relation(*t, index=index))
         return doc
 
-    def extract_nsubj_noun_nmod_relations(self, doc):
+    def extract_nsubj_noun_nmod_relations(self, doc, index):
         ''' extract (subject, pred, object) triples '''
 
         # start extraction from nsubj
-        for subj in filter(lambda t: is_xsubj(t), doc):
-            if (not filter_subj(nsubj)):
+        for subj in index.xsubj:
+            if (not filter_subj(subj)):
                 continue  # skip none-entity
             logging.debug('(x:{}) subj: {}'.format(self.name, subj))
 
             # pred: <NOUN>
             pred = subj.head
-            if (pred.pos_ != 'NOUN'):
+            if (not index.is_pos(pred.i, 'NOUN')):
                 continue  # skip if not NOUN
 
             # amod: 'el primer presidente'
@@ -48,7 +52,6 @@ class ES_NSUBJ_NOUN_NMOD_RelationExtractor(object):
                 end = max(pred.i, amod.i)
             pred_span = doc[start: end+1]
             logging.debug('(x:{}) pred: {}'.format(self.name, pred_span))
-            print(list(pred.children))
 
             # extract objects (nmod) and relations
             for obj in filter(lambda w: w.dep_ == 'nmod', pred.children):
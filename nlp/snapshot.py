@@ -0,0 +1,136 @@
+'''
+snapshot of a fully assembled nlpy pipeline (model + nlpy components),
+restored by Nlpy.load without rebuilding the components.
+
+layout:
+    <path>/nlpy.json        - snapshot config
+    <path>/model/           - spacy model (without nlpy components)
+    <path>/nlpy_entities/   - entities pipeline config and term-list matcher state
+
+create a snapshot (from the repository root):
+    python -m nlp.snapshot en snapshots/en
+
+load it:
+    Nlpy.load('snapshots/en')
+    or: NLPY_SNAPSHOT_DIR=snapshots and Nlpy.load('en')
+'''
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import spacy
+from logger import logger
+
+SNAPSHOT_CFG = 'nlpy.json'
+
+# nlpy components (not part of the saved spacy model)
+NLPY_PIPES = ('nlpy_entities', 'nlpy_relations')
+
+
+def is_snapshot(path):
+    return os.path.isfile(os.path.join(path, SNAPSHOT_CFG))
+
+
+def find_snapshot(model):
+    '''
+    snapshot path for a model: the model itself (a snapshot directory),
+    or <NLPY_SNAPSHOT_DIR>/<model>. returns None if not found.
+    '''
+    if (os.path.isdir(model) and is_snapshot(model)):
+        return model
+    snapshot_dir = os.environ.get('NLPY_SNAPSHOT_DIR')
+    if snapshot_dir:
+        path = os.path.join(snapshot_dir, model)
+        if is_snapshot(path):
+            return path
+    return None
+
+
+def save_snapshot(nlp, path, model=None):
+    '''
+    save an assembled nlpy pipeline (see Nlpy.load).\n
+    an existing path is replaced only if it is a snapshot (or an empty directory),
+    the snapshot is written next to it and then moved into place
+    '''
+    path = os.path.normpath(path)
+    if (os.path.exists(path) and not (is_snapshot(path) or _is_empty_dir(path))):
+        raise ValueError("'%s' exists and is not a snapshot (not overwritten)" % path)
+
+    parent = os.path.dirname(os.path.abspath(path))
+    if (not os.path.exists(parent)):
+        os.makedirs(parent)
+    tmp = tempfile.mkdtemp(prefix='.%s.' % os.path.basename(path), dir=parent)
+    try:
+        _write_snapshot(nlp, tmp, model)
+        _replace_dir(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    logger.info("Saved snapshot of '%s' to '%s'" % (model or nlp.lang, path))
+
+
+def _write_snapshot(nlp, path, model):
+    # spacy model (without nlpy components)
+    with nlp.disable_pipes(*[p for p in NLPY_PIPES if p in nlp.pipe_names]):
+        nlp.to_disk(os.path.join(path, 'model'))
+
+    # nlpy components
+    nlp.get_pipe('nlpy_entities').to_disk(
+        os.path.join(path, 'nlpy_entities'))
+
+    cfg = {
+        'model': model,
+        'lang': nlp.lang,
+        'spacy_version': spacy.__version__,
+        'pipeline': nlp.pipe_names,
+    }
+    with open(os.path.join(path, SNAPSHOT_CFG), 'w') as f:
+        json.dump(cfg, f, indent=4, sort_keys=True)
+
+
+def _is_empty_dir(path):
+    return os.path.isdir(path) and not os.listdir(path)
+
+
+def _replace_dir(src, dst):
+    ''' move directory src to dst (an existing dst is removed after the move) '''
+    old = None
+    if os.path.exists(dst):
+        old = tempfile.mkdtemp(prefix='.%s.old.' % os.path.basename(dst),
+                               dir=os.path.dirname(src))
+        os.rmdir(old)
+        os.replace(dst, old)
+    os.replace(src, dst)
+    if old:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def load_snapshot(path):
+    ''' load a snapshot saved by save_snapshot '''
+    from .nlpy import Nlpy
+    from .entities import EntitiesPipeline
+
+    with open(os.path.join(path, SNAPSHOT_CFG), 'r') as f:
+        cfg = json.load(f)
+    if (cfg['spacy_version'] != spacy.__version__):
+        logger.warning("Snapshot '%s' was saved with spacy %s (running %s)" % (
+            path, cfg['spacy_version'], spacy.__version__))
+
+    nlp = spacy.load(os.path.join(path, 'model'))
+    entities = EntitiesPipeline.from_disk(
+        nlp, os.path.join(path, 'nlpy_entities'))
+    return Nlpy.assemble(nlp, entities)
+
+
+if __name__ == '__main__':
+    _argparser = argparse.ArgumentParser(
+        description='save a snapshot of an assembled nlpy pipeline.')
+    _argparser.add_argument('model', type=str, help='model to load (e.g: en/es)')
+    _argparser.add_argument('path', type=str, help='snapshot directory')
+    args = _argparser.parse_args()
+
+    from .nlpy import Nlpy
+    save_snapshot(Nlpy.load(args.model), args.path, args.model)
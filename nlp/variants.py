@@ -0,0 +1,79 @@
+'''
+pipeline variants: run only the components needed for the requested features.
+
+e.g:
+    nlp = Nlpy.load('en', features=['entities'])  # no parser, no relations
+    doc = nlp(text)
+'''
+
+# pipeline components needed per feature
+FEATURES = {
+    'entities': ('tagger', 'ner', 'nlpy_entities'),
+    'relations': ('tagger', 'parser', 'ner', 'nlpy_entities', 'nlpy_relations'),
+    'wordmap': ('tagger', 'parser', 'ner', 'nlpy_entities'),
+    'summarization': ('parser',),  # sentences
+    'noun_chunks': ('tagger', 'parser'),
+}
+
+
+def required_pipes(nlp, features):
+    '''
+    names of the components needed for the given features.\n
+    components may declare other components they depend on (component.requires)
+    '''
+    names = set()
+    for feature in features:
+        if (not feature in FEATURES):
+            raise ValueError("unknown feature: '%s'" % feature)
+        names.update(FEATURES[feature])
+
+    for name, proc in nlp.pipeline:
+        if (name in names):
+            names.update(getattr(proc, 'requires', ()))
+    return names
+
+
+class PipelineVariant(object):
+    '''
+    a view of a loaded model that runs a subset of its pipeline components.\n
+    shares the model (vocab, weights) and is safe to use concurrently
+    (unlike nlp.disable_pipes, which modifies the model's pipeline).
+    '''
+
+    def __init__(self, nlp, features):
+        self.nlp = nlp
+        self.features = frozenset(features)
+        names = required_pipes(nlp, self.features)
+        self.pipeline = [(name, proc)
+                         for name, proc in nlp.pipeline if name in names]
+
+    @property
+    def pipe_names(self):
+        return [name for name, _ in self.pipeline]
+
+    @property
+    def vocab(self):
+        return self.nlp.vocab
+
+    @property
+    def lang(self):
+        return self.nlp.lang
+
+    def make_doc(self, text):
+        return self.nlp.make_doc(text)
+
+    def __call__(self, text):
+        doc = self.nlp.make_doc(text)
+        for _, proc in self.pipeline:
+            doc = proc(doc)
+        return doc
+
+    def pipe(self, texts, **kwargs):
+        ''' stream docs (see nlp.pipe) running only the variant's components '''
+        names = self.pipe_names
+        disable = [name for name in self.nlp.pipe_names if not name in names]
+        return self.nlp.pipe(texts, disable=disable, **kwargs)
+
+    def __repr__(self):
+        return 'PipelineVariant(%s: %s)' % (
+            ','.join(sorted(self.features)), ', '.join(self.pipe_names))
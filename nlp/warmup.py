@@ -0,0 +1,90 @@
+'''
+preload and warm up models before serving.
+
+configuration (environment):
+    NLPY_PRELOAD        - comma separated models to preload (e.g: en,es)
+    NLPY_WARMUP_CORPUS  - glob of warmup documents (default: tests/docs per language)
+
+e.g:
+    NLPY_PRELOAD=en,es python api/server.py
+'''
+
+import glob
+import os
+import threading
+import timeit
+from collections import OrderedDict
+from logger import logger
+from .nlpy import Nlpy
+
+_ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+# default warmup corpus per language
+DEFAULT_CORPUS = {
+    'en': os.path.join(_ROOT_DIR, 'tests', 'docs', 'text*'),
+    'es': os.path.join(_ROOT_DIR, 'tests', 'docs', 'es', 'text*.es'),
+}
+
+# set once preloading/warmup is done
+ready = threading.Event()
+_preloaded = set()  # models already preloaded (and warmed up)
+
+
+def read_corpus(pattern):
+    ''' read warmup documents matching the given glob pattern '''
+    texts = []
+    for file in sorted(glob.glob(pattern)):
+        with open(file, 'r') as f:
+            texts.append(f.read())
+    return texts
+
+
+def warmup(nlp, texts):
+    '''
+    run texts through every pipeline component.\n
+    returns component timings: {name: sec}
+    '''
+    timings = OrderedDict((name, 0.0) for name in nlp.pipe_names)
+    for text in texts:
+        doc = nlp.make_doc(Nlpy.pre_process_text(text))
+        for name, proc in nlp.pipeline:
+            start = timeit.default_timer()
+            doc = proc(doc)
+            timings[name] += timeit.default_timer() - start
+    return timings
+
+
+def preload(models, corpus=None):
+    '''
+    load, pin and warm up the given models (once per process).\n
+    corpus: glob of warmup documents (default: DEFAULT_CORPUS by model language)
+    '''
+    for model in models:
+        if (model in _preloaded):
+            continue
+        _preloaded.add(model)
+        start = timeit.default_timer()
+        Nlpy.models.pin(model)  # (before loading: a full cache would evict it at once)
+        nlp = Nlpy.load(model)
+        load_time = timeit.default_timer() - start
+
+        pattern = corpus or DEFAULT_CORPUS.get(nlp.lang)
+        texts = read_corpus(pattern) if pattern else []
+        start = timeit.default_timer()
+        timings = warmup(nlp, texts)
+        warmup_time = timeit.default_timer() - start
+
+        logger.info("Preloaded model '%s' (load: %.2f sec, warmup: %.2f sec, %d docs)" % (
+            model, load_time, warmup_time, len(texts)))
+        for name, sec in timings.items():
+            logger.info("  '%s' %s: %.3f sec" % (model, name, sec))
+
+
+def preload_from_env():
+    ''' preload models configured by NLPY_PRELOAD, then report ready '''
+    models = os.environ.get('NLPY_PRELOAD', '')
+    models = [m.strip() for m in models.split(',') if m.strip()]
+    if models:
+        preload(models, os.environ.get('NLPY_WARMUP_CORPUS'))
+        logger.info('Warmup done: %s' % ', '.join(models))
+    ready.set()
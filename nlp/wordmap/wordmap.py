@@ -2,6 +2,7 @@ import spacy
 from spacy.tokens import Doc
 from collections import Counter
 from gensim.summarization import keywords
+from nlp.variants import PipelineVariant
 
 SIMILARITY_TRESHOLD = 0.90
 
@@ -20,16 +21,22 @@ class Wordmap(object):
         else:  # default
             self.create_wordmap_from_noun_chunks(text, nlp)
 
+    def parse(self, text, nlp):
+        ''' parse text (without relations) '''
+        if isinstance(nlp, PipelineVariant):
+            return nlp(text)  # the variant runs only the needed components
+        with nlp.disable_pipes('nlpy_relations'):
+            return nlp(text)
+
     def create_wordmap_from_gensim_keywords(self, text, nlp):
         self.words = Counter(keywords(text).split('\n'))
         return self.words
 
     def create_wordmap_from_noun_chunks(self, text, nlp):
         self.words = {}
-        with nlp.disable_pipes('nlpy_relations'):
-            doc = nlp(text)
-            self.words = Counter(
-                chunk.lemma_ for chunk in doc.noun_chunks if self.filter_noun_chunk(chunk))
+        doc = self.parse(text, nlp)
+        self.words = Counter(
+            chunk.lemma_ for chunk in doc.noun_chunks if self.filter_noun_chunk(chunk))
         return self.words
 
     def filter_noun_chunk(self, chunk):  # inner chunk filter
@@ -41,9 +48,8 @@ class Wordmap(object):
 
     def create_wordmap_from_tokens(self, text, nlp):
         self.words = {}
-        with nlp.disable_pipes('nlpy_relations'):
-            doc = nlp(text)
-            self.words = Counter(t.lemma_ for t in doc if self.filter_token(t))
+        doc = self.parse(text, nlp)
+        self.words = Counter(t.lemma_ for t in doc if self.filter_token(t))
         return self.words
 
     def filter_token(self, t):  # inner token filter
@@ -57,18 +63,17 @@ class Wordmap(object):
 
     def create_wordmap_from_entities(self, text, nlp):
         self.words = {}
-        with nlp.disable_pipes('nlpy_relations'):
-            doc = nlp(text)
+        doc = self.parse(text, nlp)
 
-            # start with each entity in its own cluster
-            clusters = [Cluster(e) for e in doc.ents if self.filter_entity(e)]
+        # start with each entity in its own cluster
+        clusters = [Cluster(e) for e in doc.ents if self.filter_entity(e)]
 
-            # cluster same entities together
-            clusters = self.cluster(clusters)
+        # cluster same entities together
+        clusters = self.cluster(clusters)
 
-            # generate wordmap
-            self.words = Counter(
-                c.leader.text for c in clusters for item in c.items)
+        # generate wordmap
+        self.words = Counter(
+            c.leader.text for c in clusters for item in c.items)
 
         return self.words
 
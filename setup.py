@@ -13,6 +13,7 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/yossi-cohen/nlpy",
     packages=setuptools.find_packages(),
+    package_data={'nlp.entities': ['rules/*.jsonl']},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
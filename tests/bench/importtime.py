@@ -0,0 +1,80 @@
+#!env/bin/python
+'''
+cold start benchmark: import time of the api actions (python -X importtime).
+
+fails (exit code 1) when the import exceeds the time budget,
+or when heavy dependencies (spacy, gensim) are imported eagerly.
+
+Usage (from the repository root):
+    python tests/bench/importtime.py
+    python tests/bench/importtime.py --budget 500 --top 20
+'''
+
+import argparse
+import os
+import subprocess
+import sys
+
+_ROOT_DIR = os.path.join(os.path.dirname(__file__), '..', '..')
+
+# should load on first use of the action that needs them
+HEAVY_MODULES = ('spacy', 'gensim', 'thinc', 'numpy')
+
+IMPORT_STMT = "import sys; sys.path[:0] = ['api', '.']; import actions"
+
+
+def importtime(stmt, repeat=3):
+    '''
+    run stmt in a fresh interpreter with -X importtime (best of repeat).\n
+    returns [(module, self_us, cumulative_us)]
+    '''
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', stmt],
+                              cwd=_ROOT_DIR, stderr=subprocess.PIPE,
+                              universal_newlines=True)
+        if (proc.returncode != 0):
+            raise RuntimeError(proc.stderr)
+        rows = []
+        for line in proc.stderr.splitlines():
+            if (not line.startswith('import time:') or 'cumulative' in line):
+                continue
+            self_us, cumulative_us, module = line[len('import time:'):].split('|')
+            rows.append((module.rstrip(), int(self_us), int(cumulative_us)))
+        total = sum(r[1] for r in rows)
+        if (None == best or total < best[0]):
+            best = (total, rows)
+    return best[1]
+
+
+def main(budget_ms, top):
+    rows = importtime(IMPORT_STMT)
+    total_ms = sum(r[1] for r in rows) / 1000.0
+
+    print('{:>12}\t{}'.format('cumulative', 'module'))
+    for module, _, cumulative in sorted(rows, key=lambda r: -r[2])[:top]:
+        print('{:>9.1f} ms\t{}'.format(cumulative / 1000.0, module))
+    print()
+    print('total import time: {:.1f} ms (budget: {} ms)'.format(total_ms, budget_ms))
+
+    failed = False
+    heavy = sorted(set(r[0].strip() for r in rows
+                       if r[0].strip().split('.')[0] in HEAVY_MODULES))
+    if heavy:
+        print('FAILED: heavy modules imported eagerly: %s' % ', '.join(heavy))
+        failed = True
+    if (total_ms > budget_ms):
+        print('FAILED: import time over budget')
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    _argparser = argparse.ArgumentParser(
+        description='api cold start (import time) benchmark.')
+    _argparser.add_argument('-b', '--budget', type=int, default=500,
+                            help='import time budget (ms)')
+    _argparser.add_argument('--top', type=int, default=15,
+                            help='number of slowest imports to print')
+    args = _argparser.parse_args()
+    sys.exit(main(args.budget, args.top))
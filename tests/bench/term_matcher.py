@@ -0,0 +1,148 @@
+#!env/bin/python
+'''
+term matcher backends benchmark: PhraseMatcher (phrase) vs TermIndex (index).
+
+for each term list size: build time, memory (rss delta), match throughput and
+the time of a single term update (a copy of the matcher, see TermList_Matcher.update),
+each backend in a fresh interpreter. fails (exit code 1) when the backends
+return different matches.
+
+the term list: the 1-3 grams of the documents (so that there are matches),
+padded with synthetic terms.
+
+Usage (from the repository root):
+    python tests/bench/term_matcher.py
+    python tests/bench/term_matcher.py --model en --sizes 1000,100000,1000000
+'''
+
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import random
+import string
+import subprocess
+import sys
+import timeit
+
+_ROOT_DIR = os.path.join(os.path.dirname(__file__), '..', '..')
+
+DOCS = 'tests/docs/text*'
+BACKENDS = ('phrase', 'index')
+
+
+def make_terms(texts, size, seed=0):
+    ''' size terms: document n-grams + synthetic terms (2 labels) '''
+    terms = []
+    seen = set()
+    for text in texts:
+        words = text.split()
+        for n in (1, 2, 3):
+            for i in range(len(words) - n + 1):
+                term = ' '.join(words[i:i + n])
+                if (not term in seen):
+                    seen.add(term)
+                    terms.append(term)
+    random.Random(seed).shuffle(terms)
+    terms = terms[:size // 10]  # ~10% document terms
+    rnd = random.Random(seed)
+    while (len(terms) < size):
+        term = ' '.join(''.join(rnd.choice(string.ascii_lowercase)
+                                for _ in range(rnd.randint(3, 10)))
+                        for _ in range(rnd.randint(1, 3)))
+        if (not term in seen):
+            seen.add(term)
+            terms.append(term)
+    return [{'label': 'TERM_A', 'terms': tuple(terms[0::2])},
+            {'label': 'TERM_B', 'terms': tuple(terms[1::2])}]
+
+
+def run(model, size, backend, repeat):
+    ''' benchmark a single backend (in this process), returns a results dict '''
+    import spacy
+    from nlp.memory import rss_bytes
+    from nlp.entities.term_list_matcher import TermList_Matcher
+
+    nlp = spacy.load(model)
+    texts = []
+    for path in sorted(glob.glob(os.path.join(_ROOT_DIR, DOCS))):
+        with io.open(path, 'r', encoding='utf8') as f:
+            texts.append(f.read())
+    docs = [nlp.make_doc(text) for text in texts]
+    term_list = make_terms(texts, size)
+
+    rss = rss_bytes()
+    start = timeit.default_timer()
+    matcher = TermList_Matcher(nlp, term_list, backend=backend)
+    build_time = timeit.default_timer() - start
+    memory = rss_bytes() - rss
+
+    matches = [sorted(matcher.match(doc)) for doc in docs]
+    start = timeit.default_timer()
+    for _ in range(repeat):
+        for doc in docs:
+            matcher.match(doc)
+    match_time = timeit.default_timer() - start
+    tokens = sum(len(doc) for doc in docs) * repeat
+
+    start = timeit.default_timer()
+    matcher.add_terms('TERM_A', ['nlpy bench update'])
+    update_time = timeit.default_timer() - start
+
+    digest = hashlib.md5(json.dumps(matches).encode('utf8')).hexdigest()
+    return {
+        'size': size,
+        'backend': backend,
+        'build_time': build_time,
+        'memory': memory,
+        'tokens_per_sec': tokens / match_time,
+        'update_time': update_time,
+        'matches': sum(len(m) for m in matches),
+        'digest': digest,
+    }
+
+
+def main(model, sizes, repeat):
+    from nlp.memory import format_bytes
+
+    print('{:>9} {:>8} {:>10} {:>10} {:>12} {:>11} {:>8}'.format(
+        'terms', 'backend', 'build (s)', 'memory', 'tokens/sec', 'update (s)', 'matches'))
+    failed = False
+    for size in sizes:
+        digests = set()
+        for backend in BACKENDS:
+            proc = subprocess.run(
+                [sys.executable, __file__, '--model', model, '--repeat', str(repeat),
+                 '--run', '%d,%s' % (size, backend)],
+                cwd=_ROOT_DIR, stdout=subprocess.PIPE, universal_newlines=True)
+            if (proc.returncode != 0):
+                raise RuntimeError('benchmark failed: %d terms, %s' % (size, backend))
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            digests.add(r['digest'])
+            print('{:>9} {:>8} {:>10.2f} {:>10} {:>12.0f} {:>11.3f} {:>8}'.format(
+                size, backend, r['build_time'], format_bytes(r['memory']),
+                r['tokens_per_sec'], r['update_time'], r['matches']))
+        if (len(digests) > 1):
+            print('FAILED: backends matches differ (%d terms)' % size)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    _argparser = argparse.ArgumentParser(
+        description='term matcher backends benchmark.')
+    _argparser.add_argument('-m', '--model', default='en', help='spacy model')
+    _argparser.add_argument('-s', '--sizes', default='1000,100000,1000000',
+                            help='comma separated term list sizes')
+    _argparser.add_argument('-r', '--repeat', type=int, default=20,
+                            help='match repetitions over the documents')
+    _argparser.add_argument('--run', help=argparse.SUPPRESS)  # size,backend
+    args = _argparser.parse_args()
+    sys.path[:0] = [_ROOT_DIR]
+    if args.run:
+        size, backend = args.run.split(',')
+        print(json.dumps(run(args.model, int(size), backend, args.repeat)))
+        sys.exit(0)
+    sys.exit(main(args.model, [int(s) for s in args.sizes.split(',')], args.repeat))
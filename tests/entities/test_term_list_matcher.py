@@ -0,0 +1,97 @@
+'''
+term-list matcher patterns (python -m pytest tests/entities)
+'''
+
+import os
+import tempfile
+import pytest
+import spacy
+from spacy.attrs import ORTH, LOWER
+from nlp.entities.term_list_matcher import TermList_Matcher
+from nlp.entities.term_store import TermStore
+
+# words that are spacy symbols (fixed ids, not string hashes)
+SYMBOL_TERMS = ['root cause', 'X', 'Mark Twain', 'dep', 'PERSON', 'aux mark']
+
+
+def _matcher(attr, backend='phrase'):
+    nlp = spacy.blank('en')
+    term_list = [{'label': 'TERM', 'terms': SYMBOL_TERMS}]
+    return nlp, TermList_Matcher(nlp, term_list, attr=attr, backend=backend)
+
+
+def test_patterns_are_doc_ids():
+    for attr, attr_id in (('ORTH', ORTH), ('LOWER', LOWER)):
+        nlp, matcher = _matcher(attr)
+        patterns = list(matcher._make_patterns(SYMBOL_TERMS))
+        for term, pattern in zip(SYMBOL_TERMS, patterns):
+            expected = nlp.make_doc(term).to_array(attr_id).tolist()
+            assert list(pattern) == expected, (attr, term)
+
+
+def test_symbol_terms_match():
+    for backend in ('phrase', 'index'):
+        for attr in ('ORTH', 'LOWER'):
+            nlp, matcher = _matcher(attr, backend)
+            for term in SYMBOL_TERMS:
+                doc = nlp.make_doc('the %s here' % term)
+                spans = [(start, end) for _, start, end in matcher.match(doc)]
+                assert (1, 1 + len(term.split())) in spans, (backend, attr, term)
+
+
+def test_symbol_terms_store():
+    nlp = spacy.blank('en')
+    term_list = [{'label': 'TERM', 'terms': SYMBOL_TERMS}]
+    path = os.path.join(tempfile.mkdtemp(), 'terms.gaz')
+    TermList_Matcher.compile_store(nlp, term_list, path, attr='LOWER')
+    store = TermStore(path, nlp.vocab)
+    for term in SYMBOL_TERMS:
+        doc = nlp.make_doc('the %s here' % term.lower())
+        spans = [(start, end) for _, start, end in store.match(doc)]
+        assert (1, 1 + len(term.split())) in spans, term
+
+
+def test_update_other_labels_untouched(monkeypatch):
+    nlp = spacy.blank('en')
+    term_list = [{'label': 'BIG', 'terms': ['term %d' % i for i in range(1000)]},
+                 {'label': 'SMALL', 'terms': ['cat', 'dog']}]
+    for backend in ('phrase', 'index'):
+        matcher = TermList_Matcher(nlp, term_list, backend=backend)
+        state = matcher._state
+        added = []  # (label, pattern) added to the matcher by the updates
+        add = type(state.matcher).add
+
+        def record(self, label, on_match, *patterns):
+            added.extend((label, pattern) for pattern in patterns)
+            add(self, label, on_match, *patterns)
+
+        monkeypatch.setattr(type(state.matcher), 'add', record)
+        matcher.add_terms('SMALL', ['cow'])
+        matcher.remove_terms('SMALL', ['dog'])
+        monkeypatch.undo()
+
+        assert set(label for label, _ in added) == {'SMALL'}, backend
+        assert state.terms['BIG'] is matcher._state.terms['BIG'], backend
+        if (backend == 'phrase'):
+            # the other label matchers are shared, not rebuilt
+            assert state.matcher.matchers['BIG'] is matcher._state.matcher.matchers['BIG']
+        else:
+            assert len(added) == 1  # the added pattern only
+        doc = nlp.make_doc('a cat, a dog and a cow: term 7')
+        spans = sorted((nlp.vocab.strings[label], start, end)
+                       for label, start, end in matcher.match(doc))
+        assert spans == [('BIG', 9, 11), ('SMALL', 1, 2), ('SMALL', 7, 8)], backend
+        # in-flight matching (the previous state) is unchanged
+        spans = sorted((start, end) for _, start, end in matcher.match(doc, state))
+        assert spans == [(1, 2), (4, 5), (9, 11)], backend
+
+
+def test_untokenizable_term():
+    nlp = spacy.blank('en')
+    term_list = [{'label': 'TERM', 'terms': ['cat', '', 'dog']}]
+    with pytest.raises(ValueError, match="''"):
+        TermList_Matcher(nlp, term_list, attr='LEMMA')
+    matcher = TermList_Matcher(nlp, [{'label': 'TERM', 'terms': ['cat']}], attr='LEMMA')
+    with pytest.raises(ValueError):
+        matcher.add_terms('TERM', ['dog', '', 'cow'])
+    assert matcher.term_list == [{'label': 'TERM', 'terms': ('cat',)}]  # unchanged
@@ -28,16 +28,16 @@ class Gold(object):
         if (len(doc_relations) == 0 and len(gold_relations) == 0):
             return scoring  # empty match
 
-        for r in doc_relations:
-            if (not r.p):
-                continue # lilo: skip relations without predicate (general related)
-            if (gold_relations.contains(r)):
+        # lilo: skip relations without predicate (general related)
+        predicted = [r for r in doc_relations if r.p]
+        for found in gold_relations.contains_all(predicted):
+            if (found):
                 scoring.true_positives += 1
             else:
                 scoring.false_positives += 1
 
-        for r in gold_relations:
-            if (not doc_relations.contains(r)):
+        for found in doc_relations.contains_all(gold_relations):
+            if (not found):
                 scoring.false_negatives += 1
 
         return scoring
@@ -0,0 +1,32 @@
+'''
+model cache eviction (python -m pytest tests/test_model_cache.py)
+'''
+
+from nlp.model_cache import ModelCache
+
+
+def test_put_keeps_the_new_model():
+    # the other models are pinned/leased: nothing can be evicted
+    cache = ModelCache(max_models=2, pinned=['a'])
+    cache.put('a', 'nlp-a')
+    cache.put('b', 'nlp-b', lease=True)
+    cache.put('c', 'nlp-c')
+    assert list(cache) == ['a', 'b', 'c']
+    assert 'nlp-c' == cache.get('c')
+    assert 0 == cache.evictions
+
+    # evicted on the next put/release (least recently used first)
+    cache.release('b')
+    assert list(cache) == ['a', 'c']
+    cache.put('d', 'nlp-d')
+    assert list(cache) == ['a', 'd']
+    assert 2 == cache.evictions
+
+
+def test_put_evicts_least_recently_used():
+    cache = ModelCache(max_models=2)
+    cache.put('a', 'nlp-a')
+    cache.put('b', 'nlp-b')
+    cache.get('a')
+    cache.put('c', 'nlp-c')
+    assert list(cache) == ['a', 'c']